@@ -0,0 +1,180 @@
+import struct
+import zlib
+
+import numpy as np
+
+
+# MAT-file v5 data types and the array classes stored as plain numbers
+_DATA_TYPES = {1: 'i1', 2: 'u1', 3: '<i2', 4: '<u2', 5: '<i4', 6: '<u4', 7: '<f4', 9: '<f8',
+               12: '<i8', 13: '<u8', 16: 'u1', 17: '<u2'}
+_MI_MATRIX = 14
+_MI_COMPRESSED = 15
+_CELL, _STRUCT, _OBJECT, _CHAR, _OPAQUE = 1, 2, 3, 4, 17
+_NUMERIC_CLASSES = range(4, 16)
+
+
+def _elements(buffer):
+    """Yield ``(data_type, data)`` of every element in a MAT v5 byte stream."""
+    pos = 0
+    while pos + 8 <= len(buffer):
+        data_type, size = struct.unpack_from('<II', buffer, pos)
+        if data_type >> 16:
+            # Small data element: size and type packed into the first four bytes
+            size = data_type >> 16
+            data_type &= 0xffff
+            data = buffer[pos + 4:pos + 4 + size]
+            pos += 8
+        else:
+            data = buffer[pos + 8:pos + 8 + size]
+            # Compressed elements are not padded to 8 bytes
+            pos += 8 + (size if data_type == _MI_COMPRESSED else (size + 7) // 8 * 8)
+
+        if data_type == _MI_COMPRESSED:
+            yield from _elements(zlib.decompress(data))
+        else:
+            yield data_type, data
+
+
+def _array(data):
+    """``(name, value)`` of a miMATRIX element; structs become dicts and cells lists."""
+    if not data:
+        return "", None
+
+    elements = _elements(data)
+    _, flags = next(elements)
+    array_class = flags[0]
+    if array_class == _OPAQUE:
+        # Opaque arrays have no dimensions, only a name, type system and class name
+        _, name = next(elements)
+        next(elements)
+        next(elements)
+        for data_type, value in elements:
+            if data_type == _MI_MATRIX:
+                return name.decode('ascii', 'replace'), _array(value)[1]
+        return name.decode('ascii', 'replace'), None
+
+    _, dims = next(elements)
+    _, name = next(elements)
+    dims = tuple(np.frombuffer(dims, '<i4'))
+    name = name.decode('ascii', 'replace')
+
+    if array_class in _NUMERIC_CLASSES:
+        data_type, values = next(elements, (9, b''))
+        values = np.frombuffer(values, _DATA_TYPES[data_type])
+        if array_class == _CHAR:
+            return name, ''.join(map(chr, values))
+        if values.size != int(np.prod(dims)):
+            return name, np.zeros(dims)
+        return name, values.reshape(dims, order='F')
+
+    if array_class == _CELL:
+        return name, [_array(value)[1] for data_type, value in elements if data_type == _MI_MATRIX]
+
+    if array_class in (_STRUCT, _OBJECT):
+        if array_class == _OBJECT:
+            next(elements)  # class name
+        _, field_length = next(elements)
+        _, field_names = next(elements)
+        field_length = struct.unpack('<i', field_length)[0]
+        fields = [field_names[i:i + field_length].rstrip(b'\0').decode('ascii')
+                  for i in range(0, len(field_names), field_length)]
+        values = [_array(value)[1] for data_type, value in elements if data_type == _MI_MATRIX]
+        records = [dict(zip(fields, values[i:i + len(fields)])) for i in range(0, len(values), max(len(fields), 1))]
+        return name, records[0] if len(records) == 1 else records
+
+    return name, None
+
+
+def read_mat(path):
+    """Variables of a MAT v5 file, MATLAB objects included.
+
+    ``scipy.io.loadmat`` leaves MATLAB class instances (``cameraParameters``,
+    ``rigidtform3d``) as opaque placeholders; their properties are stored in
+    the file's subsystem, which is returned under ``"__subsystem__"``.
+    """
+    with open(path, 'rb') as f:
+        buffer = f.read()
+
+    variables = {}
+    for data_type, data in _elements(buffer[128:]):
+        if data_type != _MI_MATRIX:
+            continue
+        name, value = _array(data)
+        if isinstance(value, np.ndarray) and value.dtype == np.uint8 and value.tobytes()[2:4] == b'IM':
+            # The subsystem is itself a MAT stream after an 8-byte header
+            value = [_array(sub)[1] for sub_type, sub in _elements(value.tobytes()[8:]) if sub_type == _MI_MATRIX]
+            name = "__subsystem__"
+        variables[name] = value
+    return variables
+
+
+def _records(value):
+    """Every dict nested anywhere in ``value``."""
+    if isinstance(value, dict):
+        yield value
+        value = list(value.values())
+    if isinstance(value, list):
+        for item in value:
+            yield from _records(item)
+
+
+class CameraCalibration:
+    """Pinhole camera with radial/tangential distortion, in MATLAB's conventions.
+
+    ``K`` is the intrinsic matrix with 1-based pixel centres, ``R``/``t``
+    map world points into camera coordinates (``R @ p + t``) and
+    ``image_size`` is ``(rows, columns)``.
+    """
+
+    def __init__(self, K, R, t, radial=(0, 0), tangential=(0, 0), image_size=(720, 1280)):
+        self.K = np.asarray(K, dtype=np.float64)
+        self.R = np.asarray(R, dtype=np.float64)
+        self.t = np.asarray(t, dtype=np.float64).ravel()
+        self.radial = np.asarray(radial, dtype=np.float64).ravel()
+        self.tangential = np.asarray(tangential, dtype=np.float64).ravel()
+        self.image_size = tuple(int(v) for v in np.asarray(image_size).ravel())
+
+    @classmethod
+    def from_mat(cls, path):
+        """Read the intrinsics of a ``cameraParameters`` and the extrinsics of a ``rigidtform3d``."""
+        variables = read_mat(path)
+        intrinsics = extrinsics = None
+        for record in _records(list(variables.values())):
+            if "K" in record and "RadialDistortion" in record:
+                intrinsics = record
+            elif "R" in record and "Translation" in record and np.any(record["Translation"]):
+                extrinsics = record
+
+        if intrinsics is None or extrinsics is None:
+            raise ValueError(f"No camera parameters and extrinsics found in {path}")
+
+        return cls(K=intrinsics["K"], R=extrinsics["R"], t=extrinsics["Translation"],
+                   radial=intrinsics["RadialDistortion"], tangential=intrinsics["TangentialDistortion"],
+                   image_size=intrinsics["ImageSize"])
+
+    @property
+    def center(self):
+        """Camera position in world coordinates."""
+        return -self.R.T @ self.t
+
+    def project(self, points, camera_offset=(0, 0, 0)):
+        """0-based pixel coordinates of world ``points`` (N x 3) and a mask of those in front of the camera.
+
+        ``camera_offset`` moves the camera, as ``move_platform_up`` does with every layer.
+        """
+        camera = (np.asarray(points, dtype=np.float64) - camera_offset) @ self.R.T + self.t
+        in_front = camera[:, 2] > 1e-6
+        depth = np.where(in_front, camera[:, 2], 1)
+        x = camera[:, 0] / depth
+        y = camera[:, 1] / depth
+
+        r2 = x * x + y * y
+        scale = 1 + sum(k * r2 ** (i + 1) for i, k in enumerate(self.radial))
+        p1, p2 = (tuple(self.tangential) + (0, 0))[:2]
+        xd = x * scale + 2 * p1 * x * y + p2 * (r2 + 2 * x * x)
+        yd = y * scale + p1 * (r2 + 2 * y * y) + 2 * p2 * x * y
+
+        K = self.K
+        u = K[0, 0] * xd + K[0, 1] * yd + K[0, 2] - 1
+        v = K[1, 1] * yd + K[1, 2] - 1
+        return np.column_stack((u, v)), in_front
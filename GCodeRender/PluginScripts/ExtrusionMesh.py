@@ -0,0 +1,150 @@
+import numpy as np
+
+
+def ellipse_profile(major_radius, minor_radius):
+    """The 8-point bead cross-section ``create_ellipse_bevel`` uses, as (x, y) pairs."""
+    return np.array([
+        (major_radius, 0),
+        (major_radius * 0.75, minor_radius * 0.75),
+        (0, minor_radius),
+        (-major_radius * 0.75, minor_radius * 0.75),
+        (-major_radius, 0),
+        (-major_radius * 0.75, -minor_radius * 0.75),
+        (0, -minor_radius),
+        (major_radius * 0.75, -minor_radius * 0.75),
+    ], dtype=np.float32)
+
+
+def _frames(points, cyclic):
+    """Side and up vectors of the cross-section at every point of a path."""
+    directions = np.diff(points, axis=0)
+    if cyclic:
+        directions = np.vstack((directions, points[:1] - points[-1:]))
+
+    lengths = np.linalg.norm(directions, axis=1, keepdims=True)
+    directions = np.divide(directions, lengths, out=np.zeros_like(directions), where=lengths > 0)
+
+    if cyclic:
+        tangents = directions + np.roll(directions, 1, axis=0)
+    else:
+        tangents = np.vstack((directions[:1], directions[:-1] + directions[1:], directions[-1:]))
+
+    # Zero tangents (repeated points, reversals) take the last usable one
+    valid = np.linalg.norm(tangents, axis=1) > 1e-9
+    if not valid.any():
+        tangents[:] = (1, 0, 0)
+    else:
+        source = np.where(valid, np.arange(len(tangents)), -1)
+        np.maximum.accumulate(source, out=source)
+        source[source < 0] = np.flatnonzero(valid)[0]
+        tangents = tangents[source]
+    tangents /= np.linalg.norm(tangents, axis=1, keepdims=True)
+
+    # The bead width lies flat on the layer, its height along Z
+    side = np.cross(tangents, (0, 0, 1))
+    side_length = np.linalg.norm(side, axis=1, keepdims=True)
+    vertical = side_length[:, 0] < 1e-6
+    side[vertical] = (1, 0, 0)
+    side_length[vertical] = 1
+    side /= side_length
+    up = np.cross(side, tangents)
+
+    return side, up
+
+
+def sweep_path(points, profile, cyclic=None):
+    """Sweep ``profile`` along ``points`` into a closed tube.
+
+    Returns ``(vertices, loop_vertices, loop_starts, cap_polygons)``: vertex
+    coordinates (float32, V x 3), the vertex index of every face corner, the
+    first corner of every face, and a mask of the faces that are end caps.
+    A path whose first and last point coincide is swept as a closed loop
+    without caps, like a cyclic curve.
+    """
+    points = np.asarray(points, dtype=np.float32)
+    if cyclic is None:
+        cyclic = len(points) > 2 and np.array_equal(points[0], points[-1])
+    if cyclic:
+        points = points[:-1]
+
+    ring = len(profile)
+    count = len(points)
+    side, up = _frames(points.astype(np.float64), cyclic)
+
+    vertices = (points[:, None, :]
+                + profile[None, :, 0, None] * side[:, None, :]
+                + profile[None, :, 1, None] * up[:, None, :]).astype(np.float32).reshape(-1, 3)
+
+    # One quad per profile edge per path segment
+    rings = count if cyclic else count - 1
+    a = np.arange(rings)[:, None] * ring
+    b = (np.arange(1, rings + 1) % count)[:, None] * ring
+    j = np.arange(ring)[None, :]
+    k = (j + 1) % ring
+    quads = np.stack((a + j, b + j, b + k, a + k), axis=-1).reshape(-1, 4)
+
+    loop_vertices = [quads.ravel()]
+    face_sizes = [np.full(len(quads), 4)]
+    if not cyclic:
+        loop_vertices.append(np.arange(ring))
+        loop_vertices.append((count - 1) * ring + np.arange(ring)[::-1])
+        face_sizes.append([ring, ring])
+
+    face_sizes = np.concatenate(face_sizes)
+    loop_starts = np.concatenate(([0], np.cumsum(face_sizes)[:-1]))
+    caps = np.zeros(len(face_sizes), dtype=bool)
+    if not cyclic:
+        caps[-2:] = True
+
+    return vertices, np.concatenate(loop_vertices).astype(np.int32), loop_starts.astype(np.int32), caps
+
+
+def sweep_paths(paths, profile):
+    """:func:`sweep_path` every path and merge the results into one mesh."""
+    vertices, loops, starts, caps = [], [], [], []
+    vertex_offset = loop_offset = 0
+    for points in paths:
+        path_vertices, path_loops, path_starts, path_caps = sweep_path(points, profile)
+        vertices.append(path_vertices)
+        loops.append(path_loops + vertex_offset)
+        starts.append(path_starts + loop_offset)
+        caps.append(path_caps)
+        vertex_offset += len(path_vertices)
+        loop_offset += len(path_loops)
+
+    if not vertices:
+        return (np.zeros((0, 3), dtype=np.float32), np.zeros(0, dtype=np.int32),
+                np.zeros(0, dtype=np.int32), np.zeros(0, dtype=bool))
+
+    return np.concatenate(vertices), np.concatenate(loops), np.concatenate(starts), np.concatenate(caps)
+
+
+def path_polylines(paths):
+    """Vertices and edges of every path as a separate polyline.
+
+    Returns ``(vertices, edges, vertex_counts)``. A path whose first and last
+    point coincide is closed into a loop, so it becomes a cyclic curve once
+    the edges are converted back to curves.
+    """
+    vertices, edges, counts = [], [], []
+    offset = 0
+    for points in paths:
+        points = np.asarray(points, dtype=np.float32)
+        cyclic = len(points) > 2 and np.array_equal(points[0], points[-1])
+        if cyclic:
+            points = points[:-1]
+
+        index = np.arange(offset, offset + len(points), dtype=np.int32)
+        path_edges = np.column_stack((index[:-1], index[1:]))
+        if cyclic:
+            path_edges = np.vstack((path_edges, (index[-1], index[0])))
+
+        vertices.append(points)
+        edges.append(path_edges)
+        counts.append(len(points))
+        offset += len(points)
+
+    if not vertices:
+        return np.zeros((0, 3), dtype=np.float32), np.zeros((0, 2), dtype=np.int32), np.zeros(0, dtype=np.int64)
+
+    return np.concatenate(vertices), np.concatenate(edges).astype(np.int32), np.array(counts, dtype=np.int64)
@@ -0,0 +1,100 @@
+import mmap
+import os
+
+import numpy as np
+
+
+class GCodeFile:
+    """Read-only, memory-mapped view of a G-code file.
+
+    The file is exposed as a byte ``buffer`` plus ``line_offsets``, the byte
+    offset of every line start (with one extra entry for the end of the
+    buffer), so no Python string is created per line. Lines are yielded as
+    ``bytes`` by :meth:`iter_lines`, only while they are being walked.
+    """
+
+    def __init__(self, path=None):
+        self.path = None
+        self.size = -1
+        self.mtime_ns = -1
+        self.buffer = b''
+        self.line_offsets = np.zeros(1, dtype=np.int64)
+        self._file = None
+
+        if path is not None:
+            self.open(path)
+
+    def __len__(self):
+        return len(self.line_offsets) - 1
+
+    def is_current(self, path):
+        """True when ``path`` is the mapped file and its size and mtime have not changed."""
+        if self.path is None or os.path.abspath(path) != self.path:
+            return False
+
+        stat = os.stat(path)
+        return stat.st_size == self.size and stat.st_mtime_ns == self.mtime_ns
+
+    def open(self, path):
+        self.close()
+
+        stat = os.stat(path)
+        self._file = open(path, 'rb')
+        if stat.st_size > 0:
+            self.buffer = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self.buffer = b''
+
+        self.path = os.path.abspath(path)
+        self.size = stat.st_size
+        self.mtime_ns = stat.st_mtime_ns
+        self.line_offsets = self._scan_lines(self.buffer)
+
+    def release(self):
+        """Unmap and close the file but keep its line count and identity.
+
+        ``len`` and :meth:`is_current` keep working; the file is no longer
+        locked (Windows refuses to overwrite a mapped file), but its lines
+        can't be read until it is opened again.
+        """
+        if isinstance(self.buffer, mmap.mmap):
+            self.buffer.close()
+        if self._file is not None:
+            self._file.close()
+
+        self.buffer = b''
+        self._file = None
+
+    def close(self):
+        self.release()
+
+        self.path = None
+        self.size = -1
+        self.mtime_ns = -1
+        self.line_offsets = np.zeros(1, dtype=np.int64)
+
+    @staticmethod
+    def _scan_lines(buffer):
+        size = len(buffer)
+        if size == 0:
+            return np.zeros(1, dtype=np.int64)
+
+        data = np.frombuffer(buffer, dtype=np.uint8)
+        ends = np.flatnonzero(data == ord('\n')).astype(np.int64) + 1
+        if len(ends) == 0 or ends[-1] != size:
+            ends = np.append(ends, size)
+
+        return np.concatenate(([0], ends))
+
+    def line(self, idx):
+        return self.buffer[self.line_offsets[idx]:self.line_offsets[idx + 1]]
+
+    def iter_lines(self, start=0, stop=None):
+        """Yield lines ``start`` to ``stop`` as ``bytes``, newline included."""
+        if stop is None or stop > len(self):
+            stop = len(self)
+
+        buffer = self.buffer
+        offsets = self.line_offsets[start:stop + 1].tolist()
+        for begin, end in zip(offsets, offsets[1:]):
+            yield buffer[begin:end]
@@ -1,17 +1,35 @@
+import collections
 import functools
+import bisect
 import math
 import os
 import sys
 import time
 from pathlib import Path
 
+import bmesh
 import bpy
 from bpy.types import Context
 import mathutils
+import numpy as np
+
+from ExtrusionMesh import ellipse_profile, sweep_paths
+from GCodeFile import GCodeFile
+from ImageWriter import ImageWriter, write_image
+from LayerSelection import select_layers
+import RenderPasses
+from RenderProfiles import DEFAULT_PROFILE, apply_render_profile, profile_settings
+from RenderTelemetry import RenderTelemetry
+from RenderTiming import RenderTiming
+from RenderRecord import RenderRecord, find_previous_run, layer_fingerprints
+from Toolpath import BED_SIZE, bed_origin, parse_buffer, simplify_points
+from ToolpathCache import ToolpathCache
+from VideoStream import VideoStreams, encoder_error
+from ToolpathNodes import MAX_LAYER_INPUT, PROFILE_INPUT, create_toolpath_object, set_toolpath_input
 
 class GCodeParser:
 
-    def __init__(self, context : Context, save_path = None, bed_size = 35, 
+    def __init__(self, context : Context, save_path = None, bed_size = BED_SIZE, 
                         camera_location = (-58.39, 1.85, 38.8), 
                         camera_rotation = (math.radians(63.13), math.radians(-0.2), math.radians(-54.3)),
                         camera_lens = 29.6,
@@ -27,7 +45,7 @@ class GCodeParser:
         self.context = context
         
         self.bed_size = bed_size * 10
-        self.offset_location = mathutils.Vector((self.bed_size/2,self.bed_size/2,0))
+        self.offset_location = mathutils.Vector(bed_origin(bed_size))
         
         self.light_init_location = (self.bed_size/2, -17.5, 38.8) # self.offset_location + mathutils.Vector((186, -234.22, 38))
         self.light_location =  self.light_init_location
@@ -65,7 +83,12 @@ class GCodeParser:
         mask_mat_name = "MaskMat"
         self.mask_material = bpy.data.materials.get(mask_mat_name)
 
+        # Reset runs __init__ again, the previous file must not stay open
+        if isinstance(getattr(self, 'lines', None), GCodeFile):
+            self.lines.close()
         self.lines = []
+        self.toolpath = None
+        self.layer_index = None
 
         self.timestr = time.strftime("%Y%m%d-%H%M%S")
         if save_path is None:
@@ -75,12 +98,52 @@ class GCodeParser:
             dir_path = f'{save_path}/images_{self.timestr}'
 
         self.dir_path = dir_path
+        self.toolpath_cache = ToolpathCache(os.path.join(os.path.dirname(dir_path), '.toolpath_cache'))
 
         self.fdm_material = None
         self.current_layer = []
+        self.layer_paths = []
         self.collections = []
         self.layer_number = 0
         self.last_e = 0
+        self.simplify_tolerance = 0
+        self.simplify_stats = []
+        self.geometry_mode = 'CURVE'
+        self.toolpath_object = None
+        self.freeze_every = 0
+        self.freeze_points = 0
+        self.freeze_keep = 2
+        self.live_layers = []
+        self.frozen_objects = []
+        self.frozen_collection = None
+        self.frozen_layers = 0
+        self.gcode_name = None
+        self.layer_fingerprints = None
+        self.render_record = None
+        # Asynchronous writes of the layer being rendered, and rendered layers waiting for theirs
+        self.layer_writes = []
+        self.pending_records = collections.deque()
+        self.render_from_layer = 0
+        self.single_render = True
+        self.view_layers = None
+        self.render_output = None
+        self.persistent_data = False
+        self.render_timing = RenderTiming()
+        self.telemetry = RenderTelemetry()
+        self.image_format = {}
+        self.async_write = False
+        self.write_workers = 2
+        self.image_writer = None
+        self.viewer = None
+        self.video_encoder = None
+        self.video_error = None
+        self.video_fps = 30
+        self.video_suffix = ""
+        self.video_streams = None
+        self.write_images = True
+        self.render_profile = DEFAULT_PROFILE
+        self.requested_lps = None
+        self.render_layers = None
 
         self.set_elip_bevel(layer_height, layer_width)
 
@@ -105,12 +168,18 @@ class GCodeParser:
             dir_path = os.path.join(save_path,f"images_{self.timestr}")
         
         self.dir_path = dir_path
+        self.toolpath_cache.cache_dir = os.path.join(os.path.dirname(dir_path), '.toolpath_cache')
 
     def set_elip_bevel(self, layer_height, layer_width):
+        self.layer_height = layer_height
+        self.layer_width = layer_width
+
         if 'Elliptical_Bevel' in bpy.data.objects:
-            bpy.data.objects.remove(bpy.data.objects['Elliptical_Bevel'])
+            self.remove_objects([bpy.data.objects['Elliptical_Bevel']])
         
         self.ellipse_bevel = self.create_ellipse_bevel("Elliptical_Bevel", major_radius=(layer_width / 2), minor_radius=(layer_height / 2) + 0.02)
+        if self.toolpath_object is not None:
+            set_toolpath_input(self.toolpath_object, PROFILE_INPUT, self.ellipse_bevel)
             
     def set_context(self, context):
         self.context = context
@@ -123,12 +192,277 @@ class GCodeParser:
     def set_filament_mat(self, material_name):
         self.fdm_material = bpy.data.materials.get(material_name)
         
+    def set_geometry_mode(self, geometry_mode):
+        if geometry_mode != self.geometry_mode:
+            self.remove_toolpath_object()
+        self.geometry_mode = geometry_mode
+
+    def set_freeze(self, every, points):
+        self.freeze_every = every
+        self.freeze_points = points
+
+    def set_simplify_tolerance(self, tolerance):
+        if tolerance != self.simplify_tolerance:
+            self.remove_toolpath_object()
+        self.simplify_tolerance = tolerance
+
+    def set_render_profile(self, profile):
+        self.render_profile = profile
+
+    def set_requested_lps(self, lp_values):
+        # None renders every layer
+        self.requested_lps = lp_values
+        self.resolve_render_layers()
+
+    def resolve_render_layers(self):
+        if self.requested_lps is None or self.layer_index is None:
+            self.render_layers = None
+            return
+
+        self.render_layers = select_layers(self.layer_index.name, self.requested_lps)
+        print(f"Rendering {len(self.render_layers)} of {len(self.layer_index)} layers")
+        if not self.render_layers:
+            missing = [value for value in self.requested_lps if os.sep in value or "/" in value]
+            hint = f", {missing[0]} is not an existing folder or file" if missing else ""
+            print(f"Warning: none of the {len(self.requested_lps)} requested lp values match a layer{hint}")
+
+    def set_persistent_data(self, persistent_data):
+        self.persistent_data = persistent_data
+
+    def set_image_format(self, **overrides):
+        # file_format, compression, quality and mask_bits on top of the render profile, None keeps the profile's
+        self.image_format = {key: value for key, value in overrides.items() if value is not None}
+
+    def set_async_write(self, async_write, workers=2):
+        if self.image_writer is not None and (not async_write or workers != self.write_workers):
+            try:
+                self.flush_writes()
+            finally:
+                self.image_writer.close()
+                self.image_writer = None
+        self.async_write = async_write
+        self.write_workers = workers
+
+    def start_image_writer(self):
+        if not self.async_write:
+            return None
+
+        if self.image_writer is None:
+            try:
+                self.image_writer = ImageWriter(workers=self.write_workers, max_pending=self.write_workers * 4)
+            except ImportError as e:
+                print(f"{e}, writing images from the render instead")
+                self.async_write = False
+        return self.image_writer
+
+    def flush_writes(self):
+        # Layers whose images were written are recorded even when another write failed
+        try:
+            if self.image_writer is not None:
+                self.image_writer.flush()
+        finally:
+            self.record_written_layers()
+
+    def set_video_stream(self, encoder, fps=30, write_images=True, suffix=""):
+        # encoder is 'ffmpeg', 'cv2' or None for no videos, the per-layer images are then always written.
+        # Checked here so a missing encoder shows up in the panel, not in the render timer
+        if encoder == 'ffmpeg' and encoder_error('ffmpeg') is not None and encoder_error('cv2') is None:
+            print("ffmpeg was not found, streaming videos with OpenCV instead")
+            encoder = 'cv2'
+        self.video_error = encoder_error(encoder) if encoder is not None else None
+        if self.video_error is not None:
+            print(f"{self.video_error}, videos are off")
+            encoder = None
+        self.video_encoder = encoder
+        self.video_fps = fps
+        self.video_suffix = suffix
+        self.write_images = write_images or encoder is None
+
+    def start_video_streams(self):
+        if self.video_encoder is None:
+            return None
+
+        if self.video_streams is not None and self.video_streams.dir_path != self.dir_path:
+            self.finish_videos()
+        if self.video_streams is None:
+            self.video_streams = VideoStreams(self.dir_path, self.video_fps, self.video_encoder, self.video_suffix)
+        return self.video_streams
+
+    def finish_videos(self):
+        if self.video_streams is not None:
+            streams, self.video_streams = self.video_streams, None
+            streams.close()
+
+    def set_telemetry(self, enabled, name=None):
+        self.telemetry.enabled = enabled
+        if name is not None:
+            # Workers sharing an image folder each need their own files
+            self.telemetry.name = name
+
+    def set_single_render(self, single_render):
+        self.single_render = single_render
+
     def set_light(self, power):
         self.light.data.energy = power
 
     def load_file(self, gcode_file):
-        with open(gcode_file, 'r') as f:
-            self.lines = f.readlines()
+        if isinstance(self.lines, GCodeFile) and self.lines.is_current(gcode_file):
+            return
+
+        if not isinstance(self.lines, GCodeFile):
+            self.lines = GCodeFile()
+        self.lines.open(gcode_file)
+        self.gcode_name = os.path.basename(gcode_file)
+        self.layer_fingerprints = None
+        self.render_from_layer = 0
+        self.remove_toolpath_object()
+
+        start = time.perf_counter()
+        content_hash = ToolpathCache.content_hash(self.lines.buffer)
+        cache_key = self.toolpath_cache.key(content_hash, self.layer_height, self.layer_width, self.offset_location)
+        self.toolpath = self.toolpath_cache.load(cache_key)
+        cached = self.toolpath is not None
+        if self.toolpath is None:
+            self.toolpath = parse_buffer(self.lines, origin=self.offset_location)
+            self.toolpath_cache.store(cache_key, self.toolpath)
+        else:
+            print(f"Toolpath loaded from cache: {cache_key}")
+        self.layer_index = self.toolpath.layers
+        self.telemetry.set_output(self.dir_path)
+        self.telemetry.event("parse", gcode=self.gcode_name, seconds=time.perf_counter() - start, cached=cached,
+                             lines=len(self.lines), layers=len(self.layer_index), moves=len(self.toolpath))
+        self.resolve_render_layers()
+
+        # Only the line count is needed from here on, unmapping lets the slicer overwrite the file
+        self.lines.release()
+
+    def render_settings(self):
+        return {
+            "bed_size": self.bed_size,
+            "camera_location": [round(v, 4) for v in self.camera_init_location],
+            "camera_rotation": [round(v, 4) for v in self.camera_init_rotation],
+            "camera_lens": round(self.camera.data.lens, 4),
+            "sensor_width": round(self.camera.data.sensor_width, 4),
+            "light_power": round(self.light.data.energy, 4),
+            "layer_height": round(self.layer_height, 4),
+            "layer_width": round(self.layer_width, 4),
+            "material": self.fdm_material.name if self.fdm_material else None,
+            "simplify_tolerance": round(self.simplify_tolerance, 4),
+            "geometry_mode": self.geometry_mode,
+            "render_profile": self.render_profile,
+            "image_format": dict(sorted(self.image_format.items())),
+        }
+
+    def start_incremental(self):
+        self.layer_fingerprints = layer_fingerprints(self.toolpath)
+        settings = self.render_settings()
+
+        record = find_previous_run(os.path.dirname(self.dir_path), self.gcode_name, settings)
+        if record is None:
+            self.render_record = RenderRecord(self.dir_path, self.gcode_name, settings)
+            self.render_from_layer = 0
+            return 0
+
+        wanted = set(self.render_layers) if self.render_layers is not None else None
+        first_changed = record.first_changed_layer(self.layer_fingerprints, wanted)
+        record.truncate(first_changed)
+
+        self.dir_path = record.dir_path
+        self.render_record = record
+        self.render_from_layer = first_changed
+        print(f"Reusing {self.dir_path}, rendering from layer {first_changed} of {len(self.layer_fingerprints)}")
+        return first_changed
+
+    def record_layer(self, layer):
+        # Only layers with images on disk can be reused, with the writer threads that is once their writes finished
+        if not self.write_images:
+            self.layer_writes = []
+            return
+
+        self.pending_records.append((layer, self.layer_writes))
+        self.layer_writes = []
+        self.record_written_layers()
+
+    def record_written_layers(self):
+        while self.pending_records and all(write.done() for write in self.pending_records[0][1]):
+            layer, writes = self.pending_records.popleft()
+            if any(write.exception() is not None for write in writes):
+                print(f"Images of layer {layer} failed to write, it is not recorded")
+                continue
+            self._append_record(layer)
+
+    def _append_record(self, layer):
+        if self.layer_fingerprints is None:
+            self.layer_fingerprints = layer_fingerprints(self.toolpath)
+
+        if self.render_record is None or self.render_record.dir_path != self.dir_path:
+            self.render_record = RenderRecord(self.dir_path, self.gcode_name, self.render_settings())
+
+        # Layers an lp selection skipped are recorded unrendered, so later layers stay reusable
+        names = self.layer_index.name
+        skipped = [(names[index], self.layer_fingerprints[index])
+                   for index in range(min(len(self.render_record.layers), layer), layer)]
+        self.render_record.append(layer, names[layer], self.layer_fingerprints[layer], skipped)
+
+    def layer_progress(self, line_num):
+        if self.layer_index is None:
+            return 0, 0
+
+        return self.layer_index.next_marker(line_num), len(self.layer_index)
+
+    def remaining_layers(self, line_num):
+        marker, layer_count = self.layer_progress(line_num)
+        if self.render_layers is not None:
+            return len(self.render_layers) - bisect.bisect_left(self.render_layers, marker)
+        return max(layer_count - max(marker, self.render_from_layer), 0)
+
+    def seek_layer(self, layer):
+        return self.layer_index.layer_start(layer)
+
+    def build_to_layer(self, layer, line_num=0):
+        """Build every layer from ``line_num`` up to ``layer`` as one object, without rendering.
+
+        Returns the line ``parse_gcode`` continues from, as if it had been
+        called once per layer.
+        """
+        layer = min(layer, len(self.layer_index))
+        stop_line = self.layer_index.layer_start(layer)
+        if stop_line <= line_num:
+            return line_num
+
+        if self.geometry_mode == 'NODES':
+            self.show_layers(layer - 1)
+        else:
+            lo, hi = self.toolpath.segment_range(line_num, stop_line)
+            for _, points in self.toolpath.iter_paths(lo, hi):
+                if self.simplify_tolerance > 0:
+                    points = points[simplify_points(points, self.simplify_tolerance)]
+
+                self.current_layer = points
+                self.close_current_loop()
+            self.close_curve()
+
+        first_marker = self.layer_index.next_marker(line_num)
+        if layer > first_marker:
+            if self.geometry_mode != 'NODES':
+                new_collection = bpy.data.collections.new(f'Collection_{layer - 1}')
+                self.context.scene.collection.children.link(new_collection)
+                self.collections.append(new_collection)
+            self.layer_number += layer - first_marker
+
+            self.set_head_pos(mathutils.Vector(self.layer_index.head[layer - 1]))
+
+        return stop_line
+
+    def skip_unrendered(self, line_num):
+        """Build the layers before the next requested render in bulk, returns the line to parse from."""
+        if self.render_layers is None or line_num > len(self.lines) - 1:
+            return line_num
+
+        current = self.layer_index.next_marker(line_num)
+        upcoming = bisect.bisect_left(self.render_layers, current)
+        target = self.render_layers[upcoming] if upcoming < len(self.render_layers) else len(self.layer_index)
+        return self.build_to_layer(target, line_num)
 
     def reset_location(self):
         self.camera.location = self.camera_init_location
@@ -149,14 +483,45 @@ class GCodeParser:
 
         return light_object
         
-    def remove_all(self):
-        bpy.ops.object.select_all(action='DESELECT')
-        bpy.ops.object.select_pattern(pattern="Layer_*")
-        bpy.ops.object.delete()
+    # Remove objects together with their curve/mesh datablocks in one batch
+    def remove_objects(self, objects, collections=()):
+        datablocks = {obj.data for obj in objects if obj.data is not None}
+        bpy.data.batch_remove(list(objects) + list(datablocks) + list(collections))
 
-        for collection in bpy.data.collections:
-            if collection.name.startswith("Collection_"):
-                bpy.data.collections.remove(collection)
+    def remove_all(self):
+        objects = [obj for obj in bpy.data.objects if obj.name.startswith("Layer_")]
+        collections = [collection for collection in bpy.data.collections if collection.name.startswith("Collection_")]
+        self.remove_objects(objects, collections)
+
+        # Datablocks orphaned by earlier sessions or add-on versions
+        orphans = [data for data in (*bpy.data.curves, *bpy.data.meshes)
+                   if data.users == 0 and data.name.startswith(("Layer_", "Elliptical_Bevel"))]
+        bpy.data.batch_remove(orphans)
+
+        self.toolpath_object = None
+        self.live_layers = []
+        self.frozen_objects = []
+        self.frozen_collection = None
+        self.frozen_layers = 0
+
+    def memory_report(self):
+        """Counts of the datablocks the add-on creates and a rough estimate of their size."""
+        curves = [data for data in bpy.data.curves if data.name.startswith("Layer_")]
+        meshes = [data for data in bpy.data.meshes if data.name.startswith("Layer_")]
+
+        # Coordinates and indices only, evaluated bevel geometry is not counted
+        curve_bytes = sum(len(spline.points) * 16 for data in curves for spline in data.splines)
+        mesh_bytes = sum(len(data.vertices) * 12 + len(data.edges) * 8 + len(data.loops) * 8 + len(data.polygons) * 12
+                         for data in meshes)
+
+        return {
+            "objects": sum(1 for obj in bpy.data.objects if obj.name.startswith("Layer_")),
+            "curves": len(curves),
+            "meshes": len(meshes),
+            "collections": sum(1 for collection in bpy.data.collections if collection.name.startswith("Collection_")),
+            "orphans": sum(1 for data in (*bpy.data.curves, *bpy.data.meshes) if data.users == 0),
+            "bytes": curve_bytes + mesh_bytes,
+        }
 
     def create_bed(self, name, size):
         # Create a new curve for the bevel shape (ellipse)
@@ -164,26 +529,16 @@ class GCodeParser:
         curve_data.dimensions = '3D'
         curve_data.fill_mode = 'FULL'  # Enable full fill for 3D object
 
-        # Create a Bézier spline
-        bezier_spline = curve_data.splines.new('BEZIER')
-        bezier_spline.bezier_points.add(3)  # Add points for a 4-point elliptical approximation
-
-        # Define the Bézier points for an ellipse (approximation with handles)
-        bezier_points = [
+        # Straight edges: a poly spline is what a Bézier with zero-length handles evaluates to
+        corners = [
             (size / 2, size / 2, 0), (size / 2,-size / 2, 0),
             (-size / 2, -size / 2, 0), (-size / 2, size / 2, 0)
         ]
-        
-        for i, (x, y, z) in enumerate(bezier_points):
-            point = bezier_spline.bezier_points[i]
-            point.co = (x, y, z)  # Set the main control point (the point itself)
-            
-            # Set the left and right handle positions to create a smoother curve (simple approximation)
-            point.handle_left_type = 'FREE'
-            point.handle_right_type = 'FREE'
+        bed_spline = curve_data.splines.new('POLY')
+        self.set_spline_points(bed_spline, corners)
 
         # Make the curve cyclic (close the shape)
-        bezier_spline.use_cyclic_u = True
+        bed_spline.use_cyclic_u = True
 
         curve_data.bevel_mode = 'PROFILE'
         curve_data.bevel_depth = 0.9
@@ -194,25 +549,6 @@ class GCodeParser:
         # bpy.context.collection.objects.link(bed_obj)
 
         bed_obj.location = self.offset_location
-        # Switch to edit mode
-        self.context.view_layer.objects.active = bed_obj
-        bpy.ops.object.mode_set(mode='EDIT')
-
-        # Select all Bézier points and scale down handles to zero length
-        for i, point in enumerate(bed_obj.data.splines[0].bezier_points):
-            # Deselect all points to ensure only one is selected at a time
-            bpy.ops.curve.select_all(action='DESELECT')
-
-            # Select the current point
-            point.select_control_point = True
-            point.select_left_handle = True
-            point.select_right_handle = True
-
-            # Scale down handles to zero
-            bpy.ops.transform.resize(value=(0, 0, 0))
-
-        # Switch back to object mode
-        bpy.ops.object.mode_set(mode='OBJECT')
     
         return bed_obj
 
@@ -247,28 +583,32 @@ class GCodeParser:
         
         return bevel_obj
 
-    # Create a new curve with the elliptical cross-section
-    def create_new_curve(self,name, points, bevel_obj,collection):
+    def set_spline_points(self, spline, points):
+        # Poly points are (x, y, z, w), written in one call instead of per point
+        points = np.asarray(points, dtype=np.float32)
+        coords = np.ones((len(points), 4), dtype=np.float32)
+        coords[:, :3] = points
+
+        spline.points.add(len(points) - len(spline.points))
+        spline.points.foreach_set("co", coords.ravel())
+
+    # Create a new curve with the elliptical cross-section, one spline per extrusion path
+    def create_new_curve(self,name, paths, bevel_obj,collection):
         # Create a new curve object
         curve_data = bpy.data.curves.new(name=name, type='CURVE')
         curve_data.dimensions = '3D'
         curve_data.fill_mode = 'FULL'  # Enable full fill for 3D object
         
-        # Create a spline for the curve
-        polyline = curve_data.splines.new('BEZIER')
-        polyline.bezier_points.add(len(points) - 1)
+        for points in paths:
+            # Create a spline for the path
+            polyline = curve_data.splines.new('POLY')
+            self.set_spline_points(polyline, points)
 
-        is_close_curve = (points[0][0] - points[-1][0])  +  (points[0][1] - points[-1][1]) +  (points[0][2] - points[-1][2]) 
-        is_close_curve = is_close_curve == 0
-        
-        for i, point in enumerate(points):
-            bezier_point = polyline.bezier_points[i]
-            bezier_point.co = point
-            bezier_point.handle_left_type = 'FREE'
-            bezier_point.handle_right_type = 'FREE'
-        
-        if is_close_curve:
-            polyline.use_cyclic_u = True
+            is_close_curve = (points[0][0] - points[-1][0])  +  (points[0][1] - points[-1][1]) +  (points[0][2] - points[-1][2]) 
+            is_close_curve = is_close_curve == 0
+            
+            if is_close_curve:
+                polyline.use_cyclic_u = True
         # Assign the elliptical bevel object to give the curve an elliptical cross-section
         curve_data.bevel_mode = 'OBJECT'
         curve_data.use_fill_caps = True
@@ -278,26 +618,6 @@ class GCodeParser:
         curve_obj = bpy.data.objects.new(name, curve_data)
         collection.objects.link(curve_obj)
         
-        # Switch to edit mode
-        self.context.view_layer.objects.active = curve_obj
-        bpy.ops.object.mode_set(mode='EDIT')
-
-        # Select all Bézier points and scale down handles to zero length
-        for i, point in enumerate(curve_obj.data.splines[0].bezier_points):
-            # Deselect all points to ensure only one is selected at a time
-            bpy.ops.curve.select_all(action='DESELECT')
-
-            # Select the current point
-            point.select_control_point = True
-            point.select_left_handle = True
-            point.select_right_handle = True
-
-            # Scale down handles to zero
-            bpy.ops.transform.resize(value=(0, 0, 0))
-
-        # Switch back to object mode
-        bpy.ops.object.mode_set(mode='OBJECT')
-        
         if curve_obj.data.materials:
             curve_obj.data.materials[0] = self.fdm_material
         else:
@@ -305,61 +625,91 @@ class GCodeParser:
         
         return curve_obj
 
-    def _full_render(self,scene,filename):
-        file_path = f'{self.dir_path}/sim_Z_lp{filename}.png'
-        scene.render.filepath = file_path
+    # Create a mesh swept with the elliptical cross-section directly from NumPy
+    def create_new_mesh(self, name, paths, collection):
+        profile = ellipse_profile(major_radius=(self.layer_width / 2), minor_radius=(self.layer_height / 2) + 0.02)
+        vertices, loop_vertices, loop_starts, caps = sweep_paths(paths, profile)
+
+        mesh_data = bpy.data.meshes.new(name)
+        mesh_data.vertices.add(len(vertices))
+        mesh_data.vertices.foreach_set("co", vertices.ravel())
+        mesh_data.loops.add(len(loop_vertices))
+        mesh_data.loops.foreach_set("vertex_index", loop_vertices)
+        # Face sizes follow from the start offsets and the total loop count
+        mesh_data.polygons.add(len(loop_starts))
+        mesh_data.polygons.foreach_set("loop_start", loop_starts)
+        mesh_data.polygons.foreach_set("use_smooth", ~caps)
+        mesh_data.update(calc_edges=True)
+
+        mesh_obj = bpy.data.objects.new(name, mesh_data)
+        collection.objects.link(mesh_obj)
+        mesh_obj.data.materials.append(self.fdm_material)
+
+        return mesh_obj
+
+    # View layers and the File Output node are built once, switching passes is then a single argument
+    def setup_render_passes(self,scene):
+        if self.view_layers is not None and scene.view_layers.get(RenderPasses.MASK_LAYER) is not None \
+                and scene.node_tree is not None and RenderPasses.OUTPUT_NODE in scene.node_tree.nodes:
+            return
 
-        bpy.ops.render.render(write_still=True)
+        RenderPasses.setup_pass_collections(scene, self.head, (self.light, self.camera))
+        self.view_layers = RenderPasses.setup_view_layers(scene, self.mask_material)
+        self.render_output = RenderPasses.setup_file_output(scene, self.view_layers)
 
-    def _custom_render(self,scene,filename,show_head=True,show_bed=True):
-        file_path = f'{self.dir_path}/bed_Z_lp{filename}.png'
+    def _pass_render(self,scene,prefix,view_layer,filename):
+        file_path = f'{self.dir_path}/{prefix}_Z_lp{filename}{scene.render.file_extension}'
         scene.render.filepath = file_path
 
-        if not show_head:
-            self.head.hide_viewport = True
-            self.head.hide_render = True
-        
-        if not show_bed:
-            self.bed.hide_viewport = True
-            self.bed.hide_render = True
+        # Without the Viewer Blender writes the file inside the render operator, so the pass time includes the write.
+        # With it the Composite output still shows the sim pass, so images are written from the Viewer pixels.
+        write_still = self.viewer is None
+        if self.viewer is not None:
+            RenderPasses.link_viewer(scene, prefix)
+        with self.telemetry.timer(prefix):
+            bpy.ops.render.render(write_still=write_still, layer=view_layer.name)
+
+        if self.viewer is None:
+            return
 
-        bpy.ops.render.render(write_still=True)
+        # The pass composited into the Viewer node goes to the video encoders and the image files
+        pixels = RenderPasses.viewer_pixels()
+        mask_bits = profile_settings(self.render_profile, self.image_format)["mask_bits"] if prefix == "msk" else None
+        if self.video_streams is not None:
+            with self.telemetry.timer("encode"):
+                self.video_streams.write(prefix, pixels, mask_bits)
+
+        if self.write_images:
+            with self.telemetry.timer("write"):
+                image_settings = scene.render.image_settings
+                if self.image_writer is not None:
+                    self.layer_writes.append(self.image_writer.write(
+                        file_path, pixels, image_settings.file_format, image_settings.color_mode,
+                        image_settings.compression, image_settings.quality, mask_bits))
+                else:
+                    write_image(file_path, pixels, image_settings.file_format, image_settings.color_mode,
+                                image_settings.compression, image_settings.quality, mask_bits)
 
-        if not show_head:
-            self.head.hide_viewport = False
-            self.head.hide_render = False
-        
-        if not show_bed:
-            self.bed.hide_viewport = False
-            self.bed.hide_render = False
+    def _full_render(self,scene,filename):
+        self._pass_render(scene, "sim", self.view_layers[0], filename)
+
+    def _custom_render(self,scene,filename):
+        # GCode_Bed excludes the head collection
+        self._pass_render(scene, "bed", self.view_layers[1], filename)
         
     def _mask_render(self,scene,filename):
-        file_path = f'{self.dir_path}/msk_Z_lp{filename}.png'
-        scene.render.filepath = file_path
-
-        for obj in bpy.data.objects:
-            if obj.name.find("guide_bed") != -1:
-                continue
-            
-            if obj.type not in {'LIGHT', 'CAMERA'}:
-                obj.hide_viewport = True
-                obj.hide_render = True
-            if obj.name.find("Layer_") != -1:
-                obj.hide_viewport = False
-                obj.hide_render = False
-                obj.data.materials[0] = self.mask_material
-
-        bpy.ops.render.render(write_still=True)
-
-        for obj in bpy.data.objects:
-            if obj.name.find("guide_bed") != -1:
-                continue
+        # GCode_Mask keeps only the layer collections, drawn with the mask material override
+        self._pass_render(scene, "msk", self.view_layers[2], filename)
 
-            obj.hide_viewport = False
-            obj.hide_render = False
+    # One render of three view layers, written by a compositor File Output node
+    def _single_render(self,scene,filename):
+        paths = RenderPasses.output_file_paths(self.render_output, scene, self.dir_path, filename)
+        with self.telemetry.timer("render"):
+            bpy.ops.render.render(write_still=False)
 
-            if obj.name.find("Layer_") != -1:
-                obj.data.materials[0] = self.fdm_material
+        with self.telemetry.timer("write"):
+            for written, final in paths:
+                os.replace(written, final)
 
     def render_image(self, filename):
         print("Rendering...")
@@ -369,31 +719,98 @@ class GCodeParser:
         
         # Set the scene
         scene = self.context.scene
+        self.layer_writes = []
 
-        # Set render resolution
-        scene.render.resolution_x = 1280
-        scene.render.resolution_y = 720
-        scene.render.resolution_percentage = 100
-
-        # Set the render file format
-        scene.render.image_settings.file_format = 'PNG'
+        # Set render resolution, sampling and file format
+        apply_render_profile(scene, self.render_profile, self.image_format)
 
         # counter = 1
         # while os.path.exists(file_path):
         #     file_path = f'{self.dir_path}/layer_{self.layer_number}_{counter}.png'
         #     counter += 1
 
+        # Keep unchanged objects in the render engine between layers, only new layers and moved objects are synced
+        scene.render.use_persistent_data = self.persistent_data
+
         # Render the scene
-        self._full_render(scene,filename)
+        self.setup_render_passes(scene)
+        mask_bits = profile_settings(self.render_profile, self.image_format)["mask_bits"]
+        RenderPasses.set_mask_samples(self.view_layers[2], mask_bits)
+        use_viewer = self.start_image_writer() is not None or self.video_encoder is not None
+        self.viewer = RenderPasses.setup_viewer(scene) if use_viewer else None
+        if use_viewer and self.viewer is None:
+            print(f"View transform {scene.view_settings.view_transform} can't be reproduced from the Viewer node, "
+                  f"writing images from the render instead of the writer threads and video streams")
+        if self.viewer is not None:
+            self.start_video_streams()
+
+        # Asynchronous writes and videos take each pass from the Viewer node, so the passes are rendered one by one
+        self.render_output.mute = self.viewer is not None
+        scene.render.use_compositing = self.single_render or self.viewer is not None
+        with self.render_timing:
+            if self.single_render and self.viewer is None:
+                self._single_render(scene,filename)
+            else:
+                self._full_render(scene,filename)
+
+                self._custom_render(scene,filename)
+                self._mask_render(scene,filename)
+
+        sync_seconds, sample_seconds = self.render_timing.last
+        self.telemetry.set(sync_seconds=sync_seconds, sample_seconds=sample_seconds)
+        print(f"Rendered {filename}: sync {sync_seconds:.2f}s, sample {sample_seconds:.2f}s")
+
+    # Build the whole print once as polylines swept by the Geometry Nodes modifier
+    def create_toolpath_object(self):
+        toolpath = self.toolpath
+        rows = np.flatnonzero(toolpath.path >= 0)
+        path_layers = np.zeros(int(toolpath.path[rows].max()) + 1 if len(rows) else 0, dtype=np.int32)
+        path_layers[toolpath.path[rows]] = toolpath.layer[rows]
+
+        paths = []
+        layers = []
+        point_count = removed_count = 0
+        for path_id, points in toolpath.iter_paths(0, len(toolpath)):
+            if self.simplify_tolerance > 0:
+                keep = simplify_points(points, self.simplify_tolerance)
+                point_count += len(points)
+                removed_count += len(points) - int(keep.sum())
+                points = points[keep]
+
+            paths.append(points)
+            layers.append(path_layers[path_id])
+
+        if self.simplify_tolerance > 0:
+            self.simplify_stats.append((toolpath.layer_count, point_count, removed_count))
+            print(f"Toolpath: simplified {point_count} points, removed {removed_count}")
+
+        collection = bpy.data.collections.new('Collection_Toolpath')
+        self.context.scene.collection.children.link(collection)
+        self.toolpath_object = create_toolpath_object("Layer_Toolpath", paths, layers, collection,
+                                                      self.ellipse_bevel, self.fdm_material)
+
+    def remove_toolpath_object(self):
+        if self.toolpath_object is None:
+            return
 
-        self._custom_render(scene,filename,show_head=False)
-        self._mask_render(scene,filename)
+        collection = bpy.data.collections.get('Collection_Toolpath')
+        self.remove_objects([self.toolpath_object], [collection] if collection is not None else [])
+        self.toolpath_object = None
+
+    def show_layers(self, max_layer):
+        # Moves of layer <= max_layer are swept, stepping layers is a single modifier input
+        if self.toolpath_object is None:
+            self.create_toolpath_object()
+        set_toolpath_input(self.toolpath_object, MAX_LAYER_INPUT, max_layer)
 
     def move_platform_up(self,z_height):
         self.light.location = (self.light.location.x, self.light.location.y, z_height + self.light_init_location[2])
         self.camera.location = (self.camera.location.x, self.camera.location.y, z_height + self.camera_init_location[2])
 
     def close_curve(self):
+        if len(self.layer_paths) == 0:
+            return
+
         if len(self.collections) == 0:
             new_collection = bpy.data.collections.new(f'Collection_{self.layer_number}')
             self.context.scene.collection.children.link(new_collection)
@@ -401,7 +818,66 @@ class GCodeParser:
 
         last_collection = self.collections[-1]
         layer_name = f"Layer_{len(self.collections)}"
-        curve_obj = self.create_new_curve(layer_name, self.current_layer, self.ellipse_bevel,last_collection)
+        if self.geometry_mode == 'MESH':
+            layer_obj = self.create_new_mesh(layer_name, self.layer_paths, last_collection)
+        else:
+            layer_obj = self.create_new_curve(layer_name, self.layer_paths, self.ellipse_bevel,last_collection)
+
+        self.live_layers.append((layer_obj, sum(len(points) for points in self.layer_paths)))
+        self.layer_paths = []
+
+        self.freeze_layers()
+
+    # Join finished layers into static meshes so renders stop re-evaluating their bevels.
+    # Every batch becomes its own object, earlier batches are never touched again.
+    def freeze_layers(self):
+        live_points = sum(count for _, count in self.live_layers)
+        over_layers = self.freeze_every > 0 and len(self.live_layers) >= self.freeze_every + self.freeze_keep
+        over_points = self.freeze_points > 0 and live_points > self.freeze_points
+        if not (over_layers or over_points) or len(self.live_layers) <= self.freeze_keep:
+            return
+
+        frozen = self.live_layers[:-self.freeze_keep]
+        self.live_layers = self.live_layers[-self.freeze_keep:]
+
+        # Hidden collections are left out of the depsgraph, their curves would freeze without the bevel
+        collections = {collection for layer_obj, _ in frozen for collection in layer_obj.users_collection}
+        hidden = [collection for collection in collections if collection.hide_viewport]
+        for collection in hidden:
+            collection.hide_viewport = False
+
+        bm = bmesh.new()
+        try:
+            depsgraph = self.context.evaluated_depsgraph_get()
+            for layer_obj, _ in frozen:
+                layer_mesh = bpy.data.meshes.new_from_object(layer_obj.evaluated_get(depsgraph))
+                bm.from_mesh(layer_mesh)
+                bpy.data.meshes.remove(layer_mesh)
+        finally:
+            for collection in hidden:
+                collection.hide_viewport = True
+
+        self.remove_objects([layer_obj for layer_obj, _ in frozen])
+
+        if self.frozen_collection is None:
+            self.frozen_collection = bpy.data.collections.new('Collection_Frozen')
+            self.context.scene.collection.children.link(self.frozen_collection)
+        # Frozen layers stay as hidden as the collections they came from (Hide Collection)
+        if hidden:
+            self.frozen_collection.hide_viewport = True
+
+        name = f"Layer_Frozen_{len(self.frozen_objects)}"
+        frozen_mesh = bpy.data.meshes.new(name)
+        bm.to_mesh(frozen_mesh)
+        bm.free()
+        frozen_mesh.materials.append(self.fdm_material)
+
+        frozen_object = bpy.data.objects.new(name, frozen_mesh)
+        self.frozen_collection.objects.link(frozen_object)
+        self.frozen_objects.append(frozen_object)
+
+        self.frozen_layers += len(frozen)
+        print(f"Froze {len(frozen)} layers, {self.frozen_layers} frozen in total")
     
     def set_head_pos(self, new_head_pos):
         self.head_pos = new_head_pos
@@ -410,8 +886,9 @@ class GCodeParser:
         self.move_platform_up(new_head_pos.z)
 
     def close_current_loop(self):
+        # Paths are collected and written as one datablock per layer by close_curve
         if len(self.current_layer) > 1:
-            self.close_curve()
+            self.layer_paths.append(self.current_layer)
 
         # self.last_e = 0
         self.current_layer = []
@@ -420,94 +897,75 @@ class GCodeParser:
 
         if line_num > len(self.lines) - 1:
             return 0
-        
-        for idx,line in enumerate(self.lines[line_num:]):
-            is_g0 = line.startswith('G0')
-            is_g1 = line.startswith('G1')
-            is_g92 = line.startswith('G92')
-            is_M118 = line.startswith('M118')
-            is_G4P50 = line.startswith('G4 P50')
-            # is_comment = line.startswith(';') or len(line.replace(" ","")) == 0
-            next_line = idx + line_num + 1
-
-            if is_g0 or is_g1 or is_g92 or is_M118 or is_G4P50:
-                x = y = z = e = None
-
-                if is_g92 or is_g0 or is_g1:
-                    params = line.split()
-                    for param in params:
-                        if param.startswith('X'):
-                            x = float(param[1:])
-                        if param.startswith('Y'):
-                            y = float(param[1:])
-                        if param.startswith('Z'):
-                            z = float(param[1:])
-                        if param.startswith('E'):
-                            e = float(param[1:])
-
-                        if param == ';':
-                            break
-                        
-                # if is_G4P50 and render:
-                #     print(f"G4 P50 on Line {idx+line_num}")
-                #     self.render_image()
-                    
-                new_head_pos = self.head_pos.copy()
-                
-                if is_g92 and e == 0:
-                    self.last_e = 0
-                    self.close_current_loop()        
-
-                if is_M118:
-                    new_collection = bpy.data.collections.new(f'Collection_{self.layer_number}')
-                    self.context.scene.collection.children.link(new_collection)
-                    if len(self.collections) > 0 and hide_new_collection:
-                        self.collections[-1].hide_viewport = True
-
-                    self.collections.append(new_collection)
-
-                    self.layer_number += 1
-
-                    self.close_current_loop()
-                    self.set_head_pos(new_head_pos)
-
-                    if render:
-                        filename = line.split(":")[1].split(",")[0]
-                        self.render_image(filename)
-                    return next_line
-                    
-                if is_g1 or is_g0:       
-
-                    if x is not None:
-                        new_head_pos.x = x
-
-                    if y is not None:
-                        new_head_pos.y = y
-
-                    if z is not None:
-                        new_head_pos.z = z
-
-                    if e is not None and e - self.last_e > 0:
-                        self.last_e = e
-                        new_pos_tup = (new_head_pos.x, new_head_pos.y, new_head_pos.z)
-                        head_pos_tup = (self.head_pos.x, self.head_pos.y, self.head_pos.z)
-                            
-                        if len(self.current_layer) == 0:
-                            self.current_layer.append(head_pos_tup)
-                            self.current_layer.append(new_pos_tup)
-                        else:
-                            self.current_layer.append(new_pos_tup)
-                            
-                    elif e is not None and e - self.last_e < 0:
-                        self.close_current_loop()
-
-                    if e is None:
-                        self.close_current_loop()
-
-                    self.set_head_pos(new_head_pos)
-
-
-        if self.current_layer:
-            self.close_current_loop()
-
-        return next_line
\ No newline at end of file
+
+        toolpath = self.toolpath
+        layer_index = self.layer_index
+        marker = layer_index.next_marker(line_num)
+        is_M118 = marker < len(layer_index)
+        stop_line = int(layer_index.line[marker]) if is_M118 else len(self.lines)
+
+        is_requested = self.render_layers is None or marker in self.render_layers
+        will_render = is_M118 and render and is_requested and marker >= self.render_from_layer
+        if will_render:
+            self.telemetry.set_output(self.dir_path)
+            self.telemetry.start_layer(marker, layer_index.name[marker])
+
+        lo, hi = toolpath.segment_range(line_num, stop_line)
+        point_count = removed_count = 0
+        # The file was parsed by load_file, this only walks the parsed toolpath
+        with self.telemetry.timer("iterate"):
+            if self.geometry_mode == 'NODES':
+                paths = ()
+            else:
+                paths = toolpath.iter_paths(lo, hi)
+            for _, points in paths:
+                if self.simplify_tolerance > 0:
+                    keep = simplify_points(points, self.simplify_tolerance)
+                    point_count += len(points)
+                    removed_count += len(points) - int(keep.sum())
+                    points = points[keep]
+
+                self.current_layer = points
+                self.close_current_loop()
+
+        layer_points = sum(len(points) for points in self.layer_paths) if self.telemetry.enabled else 0
+        with self.telemetry.timer("geometry"):
+            if self.geometry_mode == 'NODES':
+                self.show_layers(marker)
+            self.close_curve()
+
+        if self.simplify_tolerance > 0 and self.geometry_mode != 'NODES':
+            self.simplify_stats.append((self.layer_number, point_count, removed_count))
+            print(f"Layer {self.layer_number}: simplified {point_count} points, removed {removed_count}")
+
+        if is_M118:
+            new_head_pos = mathutils.Vector(layer_index.head[marker])
+        elif hi > lo:
+            new_head_pos = mathutils.Vector(toolpath.end[hi - 1])
+        else:
+            new_head_pos = self.head_pos.copy()
+
+        # The toolpath object of NODES mode holds every layer, layer collections would stay empty
+        if is_M118 and self.geometry_mode != 'NODES':
+            new_collection = bpy.data.collections.new(f'Collection_{self.layer_number}')
+            self.context.scene.collection.children.link(new_collection)
+            if len(self.collections) > 0 and hide_new_collection:
+                self.collections[-1].hide_viewport = True
+                if self.frozen_collection is not None:
+                    self.frozen_collection.hide_viewport = True
+
+            self.collections.append(new_collection)
+
+        if is_M118:
+            self.layer_number += 1
+
+        self.set_head_pos(new_head_pos)
+
+        if will_render:
+            self.render_image(layer_index.name[marker])
+            self.record_layer(marker)
+
+            self.telemetry.set(objects=len(bpy.data.objects), points=layer_points)
+            self.telemetry.end_layer()
+
+        return stop_line + 1 if is_M118 else stop_line
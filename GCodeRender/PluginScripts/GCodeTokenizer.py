@@ -0,0 +1,191 @@
+import re
+
+import numpy as np
+
+
+MOVE = 1
+SET_POSITION = 2
+MARKER = 3
+
+_AXES = b'XYZEF'
+_MAX_TOKEN = 16
+
+_WORD = re.compile(rb'[^ \t\r\n;]*')
+
+_AXIS = 1
+_BLANK = 2
+_DELIM = 3
+_CHAR_CLASS = np.zeros(256, dtype=np.uint8)
+_CHAR_CLASS[list(_AXES)] = _AXIS
+_CHAR_CLASS[list(b' \t')] = _BLANK
+_CHAR_CLASS[list(b'\r\n;\0')] = _DELIM
+
+
+class TokenColumns:
+    """Command lines of a G-code range as columns.
+
+    One row per G0/G1 (``MOVE``), G92 (``SET_POSITION``) and M118
+    (``MARKER``) line, in file order: ``line`` and ``offset`` locate the line,
+    ``kind`` is the command. ``x``/``y``/``z``/``f`` are forward-filled the way
+    the head position is inherited between moves; ``e`` is left as parsed
+    (NaN when the line has no E word), since a missing E ends a path.
+    """
+
+    def __init__(self, line, offset, kind, x, y, z, e, f):
+        self.line = line
+        self.offset = offset
+        self.kind = kind
+        self.x = x
+        self.y = y
+        self.z = z
+        self.e = e
+        self.f = f
+
+    def __len__(self):
+        return len(self.line)
+
+
+def _forward_fill(values, keep, initial):
+    """Replace NaN and rows not in ``keep`` by the last kept value, ``initial`` before that."""
+    has_value = keep & ~np.isnan(values)
+    source = np.where(has_value, np.arange(1, len(values) + 1), 0)
+    np.maximum.accumulate(source, out=source)
+    return np.concatenate(([initial], values))[source]
+
+
+def _parse_numbers(data, char_class, start):
+    """Parse the plain decimal words (``-12.345``) starting at ``start`` in bulk.
+
+    Words end at the first blank or delimiter. Digits are accumulated column
+    by column into an int64 mantissa that is divided once by a power of ten.
+    Up to 15 digits the mantissa and the power are exact doubles, so the single
+    division rounds the same way ``float()`` does. Anything else (exponents,
+    longer numbers, stray characters, words over ``_MAX_TOKEN`` bytes) comes
+    back as NaN for the caller to parse one by one.
+    """
+    count = len(start)
+    mantissa = np.zeros(count, dtype=np.int64)
+    fraction = np.zeros(count, dtype=np.int64)
+    digit_count = np.zeros(count, dtype=np.int64)
+    seen_dot = np.zeros(count, dtype=bool)
+    bad = np.zeros(count, dtype=bool)
+    inside = np.ones(count, dtype=bool)
+
+    first = data[start]
+    negative = first == ord('-')
+    signed = negative | (first == ord('+'))
+
+    for k in range(_MAX_TOKEN):
+        char = data[start + k]
+        inside &= char_class[start + k] < _BLANK
+        if not inside.any():
+            break
+
+        digit = char.astype(np.int64) - ord('0')
+        is_digit = inside & (digit >= 0) & (digit <= 9)
+        is_dot = inside & (char == ord('.'))
+
+        mantissa = np.where(is_digit, mantissa * 10 + digit, mantissa)
+        digit_count += is_digit
+        fraction += is_digit & seen_dot
+        bad |= is_dot & seen_dot
+        seen_dot |= is_dot
+        other = inside & ~is_digit & ~is_dot
+        bad |= (other & ~signed) if k == 0 else other
+    else:
+        bad |= inside & (char_class[start + _MAX_TOKEN] < _BLANK)
+
+    bad |= (digit_count == 0) | (digit_count > 15)
+    values = mantissa / 10.0 ** fraction
+    values[negative] *= -1
+    values[bad] = np.nan
+    return values
+
+
+def tokenize(buffer, line_offsets, start_line=0, stop_line=None, origin=(0, 0, 0), feed=np.nan):
+    """Pull X/Y/Z/E/F columns for lines ``start_line`` to ``stop_line`` of ``buffer`` at once.
+
+    ``line_offsets`` holds the byte offset of every line start plus the end of
+    the buffer (see ``GCodeFile.line_offsets``). Commands are matched with the
+    same prefixes ``parse_gcode`` used (``G0``/``G1``/``G92``/``M118``), words
+    after a ``;`` are ignored and the last occurrence of an axis on a line wins.
+    ``origin`` and ``feed`` are the head position and feed rate before the range.
+    """
+    line_count = len(line_offsets) - 1
+    if stop_line is None or stop_line > line_count:
+        stop_line = line_count
+
+    base = int(line_offsets[start_line])
+    size = int(line_offsets[stop_line]) - base
+    if size == 0:
+        empty = np.empty(0)
+        return TokenColumns(line=np.empty(0, dtype=np.int32), offset=np.empty(0, dtype=np.int64),
+                            kind=np.empty(0, dtype=np.int8), x=empty, y=empty.copy(), z=empty.copy(),
+                            e=empty.copy(), f=empty.copy())
+    starts = line_offsets[start_line:stop_line] - base
+    ends = line_offsets[start_line + 1:stop_line + 1] - base
+
+    data = np.zeros(size + _MAX_TOKEN + 1, dtype=np.uint8)
+    data[:size] = np.frombuffer(buffer, dtype=np.uint8, count=size, offset=base)
+
+    # Command of every line from its first four bytes. A short line stops at
+    # its own newline, so the lookahead never matches into the next line.
+    c0, c1, c2, c3 = (data[starts + k] for k in range(4))
+    is_g = c0 == ord('G')
+    is_move = is_g & ((c1 == ord('0')) | (c1 == ord('1')))
+    is_g92 = is_g & (c1 == ord('9')) & (c2 == ord('2'))
+    is_m118 = (c0 == ord('M')) & (c1 == ord('1')) & (c2 == ord('1')) & (c3 == ord('8'))
+
+    kind = np.zeros(len(starts), dtype=np.int8)
+    kind[is_move] = MOVE
+    kind[is_g92] = SET_POSITION
+    kind[is_m118] = MARKER
+
+    cmd_lines = np.flatnonzero(kind)
+    rows = len(cmd_lines)
+    row_of_line = np.full(len(starts), -1, dtype=np.int64)
+    row_of_line[cmd_lines] = np.arange(rows)
+
+    # Everything from the first ';' of a line on is a comment.
+    comment_start = ends.copy()
+    semis = np.flatnonzero(data[:size] == ord(';'))
+    semi_lines = np.searchsorted(starts, semis, side='right') - 1
+    comment_start[semi_lines[::-1]] = semis[::-1]
+
+    # Axis words: an axis letter right after a space or tab.
+    char_class = _CHAR_CLASS[data]
+    pos = np.flatnonzero((char_class[1:size] == _AXIS) & (char_class[:size - 1] == _BLANK)) + 1
+
+    pos_lines = np.searchsorted(starts, pos, side='right') - 1
+    pos_rows = row_of_line[pos_lines]
+    valid = (pos_rows >= 0) & (pos < comment_start[pos_lines])
+    pos, pos_rows = pos[valid], pos_rows[valid]
+    letters = data[pos]
+
+    # Words without a value ("X" alone) are skipped.
+    present = char_class[pos + 1] < _BLANK
+    pos, pos_rows, letters = pos[present], pos_rows[present], letters[present]
+
+    values = _parse_numbers(data, char_class, pos + 1)
+    for i in np.flatnonzero(np.isnan(values)):
+        word = _WORD.match(buffer, base + int(pos[i]) + 1).group()
+        values[i] = float(word)
+
+    columns = {}
+    for axis in _AXES:
+        column = np.full(rows, np.nan)
+        mask = letters == axis
+        column[pos_rows[mask]] = values[mask]
+        columns[axis] = column
+
+    moves = kind[cmd_lines] == MOVE
+    return TokenColumns(
+        line=(cmd_lines + start_line).astype(np.int32),
+        offset=line_offsets[cmd_lines + start_line].astype(np.int64),
+        kind=kind[cmd_lines],
+        x=_forward_fill(columns[ord('X')], moves, origin[0]),
+        y=_forward_fill(columns[ord('Y')], moves, origin[1]),
+        z=_forward_fill(columns[ord('Z')], moves, origin[2]),
+        e=columns[ord('E')],
+        f=_forward_fill(columns[ord('F')], moves, feed),
+    )
@@ -0,0 +1,119 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+try:
+    import cv2
+except ImportError:
+    cv2 = None
+
+
+IMAGE_FORMATS = ('PNG', 'JPEG', 'WEBP')
+
+
+def encode_params(file_format, compression, quality):
+    """``cv2.imwrite`` parameters for Blender's ``image_settings`` values.
+
+    ``compression`` is Blender's PNG compression in percent. WebP at quality
+    100 is written lossless, as Blender does.
+    """
+    if file_format == 'PNG':
+        return [cv2.IMWRITE_PNG_COMPRESSION, round(compression * 9 / 100)]
+    if file_format == 'JPEG':
+        return [cv2.IMWRITE_JPEG_QUALITY, quality]
+    if file_format == 'WEBP':
+        # OpenCV writes lossless WebP for a quality above 100
+        return [cv2.IMWRITE_WEBP_QUALITY, 101 if quality >= 100 else quality]
+    raise ValueError(f"Unsupported image format {file_format}, expected one of {IMAGE_FORMATS}")
+
+
+def to_image(pixels, color_mode='RGBA', mask_bits=None):
+    """Blender float pixels (bottom row first, RGBA) as a top-down 8-bit OpenCV image.
+
+    Masks with ``mask_bits`` 8 keep one channel, 1 also thresholds it to 0/255.
+    """
+    pixels = pixels[::-1]
+    if mask_bits is not None:
+        gray = np.clip(pixels[..., 0], 0, 1)
+        if mask_bits == 1:
+            return np.where(gray >= 0.5, 255, 0).astype(np.uint8)
+        return (gray * 255 + 0.5).astype(np.uint8)
+
+    image = (np.clip(pixels, 0, 1) * 255 + 0.5).astype(np.uint8)
+    if color_mode == 'RGBA':
+        return cv2.cvtColor(image, cv2.COLOR_RGBA2BGRA)
+    if color_mode == 'BW':
+        return cv2.cvtColor(image, cv2.COLOR_RGBA2GRAY)
+    return cv2.cvtColor(image, cv2.COLOR_RGBA2BGR)
+
+
+def write_image(path, pixels, file_format='PNG', color_mode='RGBA', compression=15, quality=90, mask_bits=None):
+    """Encode and write Blender float pixels on the calling thread."""
+    image = to_image(pixels, color_mode, mask_bits)
+    params = encode_params(file_format, compression, quality)
+    if mask_bits == 1 and file_format == 'PNG':
+        params += [cv2.IMWRITE_PNG_BILEVEL, 1]
+
+    # Write under a temporary name so a reader never sees half a file
+    temp_path = f"{path}.part{os.path.splitext(path)[1]}"
+    if not cv2.imwrite(temp_path, image, params):
+        raise OSError(f"Could not write {path}")
+    os.replace(temp_path, path)
+
+
+class ImageWriter:
+    """Encode and write rendered images on a thread pool.
+
+    :meth:`write` blocks once ``max_pending`` images are waiting, so a slow
+    disk holds the renders back instead of piling up frames in memory.
+    :meth:`write` returns the image's future, :meth:`flush` waits for every
+    pending image and raises the first error.
+    """
+
+    def __init__(self, workers=2, max_pending=8):
+        if cv2 is None:
+            raise ImportError("ImageWriter needs OpenCV (opencv-python)")
+
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ImageWriter")
+        self.slots = threading.BoundedSemaphore(max_pending)
+        self.pending = []
+        self.lock = threading.Lock()
+
+    def write(self, path, pixels, file_format='PNG', color_mode='RGBA', compression=15, quality=90, mask_bits=None):
+        self.slots.acquire()
+        try:
+            future = self.executor.submit(self._write, path, pixels, file_format, color_mode,
+                                          compression, quality, mask_bits)
+        except BaseException:
+            self.slots.release()
+            raise
+
+        future.add_done_callback(lambda _: self.slots.release())
+        with self.lock:
+            # Finished writes are dropped, failed ones are kept for flush to raise
+            self.pending = [pending for pending in self.pending
+                            if not pending.done() or pending.exception() is not None] + [future]
+        return future
+
+    def _write(self, path, pixels, file_format, color_mode, compression, quality, mask_bits):
+        write_image(path, pixels, file_format, color_mode, compression, quality, mask_bits)
+
+    def flush(self):
+        with self.lock:
+            pending, self.pending = self.pending, []
+
+        error = None
+        for future in pending:
+            exception = future.exception()
+            if exception is not None and error is None:
+                error = exception
+        if error is not None:
+            raise error
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            self.executor.shutdown(wait=True)
@@ -0,0 +1,62 @@
+import os
+import re
+
+
+# Same lp pattern and trailing-dot handling as the defect API (UI/API/main.py)
+LP_PATTERN = re.compile(r"_lp([0-9\.\-]+)")
+CAPTURE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+
+
+def lp_from_name(filename):
+    """lp value in a file name, e.g. ``img_3_lp0.193798.jpg`` -> ``'0.193798'``."""
+    match = LP_PATTERN.search(filename)
+    if match:
+        return match.group(1).removesuffix(".")
+    return None
+
+
+def read_lp_list(source):
+    """Requested lp values from a capture folder, a text file or a comma/space separated string.
+
+    A folder contributes the lp of every ``img_*_lp<N>`` capture in it, a
+    file one or more values per line.
+    """
+    source = source.strip()
+    if os.path.isdir(source):
+        names = sorted(name for name in os.listdir(source)
+                       if name.startswith("img_") and name.lower().endswith(CAPTURE_EXTENSIONS))
+        values = [lp_from_name(name) for name in names]
+        return [value for value in values if value]
+
+    if os.path.isfile(source):
+        with open(source) as f:
+            source = f.read()
+
+    return [value for value in re.split(r"[\s,;]+", source) if value]
+
+
+def select_layers(layer_names, lp_values):
+    """Sorted marker indices whose render name is one of ``lp_values``.
+
+    Names are matched as strings first, like the defect API pairs images,
+    then numerically so ``0.5`` also selects a marker named ``0.500000``.
+    """
+    wanted = set(lp_values)
+    wanted_numbers = set()
+    for value in lp_values:
+        try:
+            wanted_numbers.add(float(value))
+        except ValueError:
+            pass
+
+    selected = []
+    for layer, name in enumerate(layer_names):
+        if name in wanted:
+            selected.append(layer)
+            continue
+        try:
+            if float(name) in wanted_numbers:
+                selected.append(layer)
+        except ValueError:
+            pass
+    return selected
@@ -0,0 +1,112 @@
+import cv2
+import numpy as np
+
+from ExtrusionMesh import ellipse_profile, sweep_path
+
+
+# Fractional bits of the fixed-point vertices handed to OpenCV
+SUBPIXEL_BITS = 4
+
+
+class MaskRasterizer:
+    """Silhouette of the printed beads seen through a calibrated camera, without Blender.
+
+    Every extrusion segment is the elliptical bead ``create_ellipse_bevel``
+    sweeps; its projection is the convex hull of the projected cross-sections
+    at both ends. The camera rides up with the head, so :meth:`draw_layer`
+    reprojects every layer up to the marker whenever the camera offset
+    changed and only draws the new layers on top while it stays the same; the
+    swept vertices of each layer are computed once and cached.
+    """
+
+    def __init__(self, toolpath, camera, layer_height=0.2, layer_width=0.4, offset=0.02):
+        self.toolpath = toolpath
+        self.camera = camera
+        self.profile = ellipse_profile(major_radius=(layer_width / 2), minor_radius=(layer_height / 2) + offset)
+        self.mask = np.zeros(camera.image_size, dtype=np.uint8)
+        # Per layer: swept vertices and the first ring of every segment
+        self.layer_vertices = []
+        self.layer_segments = []
+        # (last layer, camera offset) the mask holds, None when it must be redrawn
+        self.drawn = None
+
+    def reset(self):
+        self.mask[:] = 0
+        self.drawn = None
+
+    def _sweep_layer(self, layer):
+        ring = len(self.profile)
+        vertices, segments = [], []
+        ring_offset = 0
+        for _, points in self.toolpath.iter_paths(*self.toolpath.layer_range(layer)):
+            path_vertices = sweep_path(points, self.profile, cyclic=False)[0]
+            rings = len(path_vertices) // ring
+            vertices.append(path_vertices)
+            segments.append(np.arange(ring_offset, ring_offset + rings - 1))
+            ring_offset += rings
+
+        if not vertices:
+            return np.empty((0, 3), dtype=np.float32), np.empty(0, dtype=np.int64)
+        return np.concatenate(vertices), np.concatenate(segments)
+
+    def draw_layer(self, layer, camera_offset=(0, 0, 0)):
+        """Mask of every layer up to marker ``layer`` seen from ``camera_offset``."""
+        while len(self.layer_vertices) <= layer:
+            vertices, segments = self._sweep_layer(len(self.layer_vertices))
+            self.layer_vertices.append(vertices)
+            self.layer_segments.append(segments)
+
+        camera_offset = tuple(float(v) for v in camera_offset)
+        if self.drawn is not None and self.drawn[1] == camera_offset and self.drawn[0] <= layer:
+            first = self.drawn[0] + 1
+        else:
+            self.reset()
+            first = 0
+
+        # One projection for all layers drawn
+        vertices = self.layer_vertices[first:layer + 1]
+        sizes = np.cumsum([0] + [len(v) // len(self.profile) for v in vertices[:-1]])
+        segments = [s + size for s, size in zip(self.layer_segments[first:layer + 1], sizes)]
+        if vertices:
+            self._fill(self.mask, np.concatenate(vertices), np.concatenate(segments), camera_offset)
+        self.drawn = (layer, camera_offset)
+        return self.mask
+
+    def draw_reference(self, layer, camera_offset=(0, 0, 0)):
+        """:meth:`draw_layer` swept from the toolpath again without the cache, into a new mask."""
+        mask = np.zeros_like(self.mask)
+        hi = self.toolpath.layer_range(layer)[1]
+        for _, points in self.toolpath.iter_paths(0, hi):
+            vertices = sweep_path(points, self.profile, cyclic=False)[0]
+            self._fill(mask, vertices, np.arange(len(vertices) // len(self.profile) - 1), camera_offset)
+        return mask
+
+    def draw_path(self, points, camera_offset=(0, 0, 0)):
+        vertices = sweep_path(points, self.profile, cyclic=False)[0]
+        self._fill(self.mask, vertices, np.arange(len(vertices) // len(self.profile) - 1), camera_offset)
+        self.drawn = None
+
+    def _fill(self, mask, vertices, segments, camera_offset):
+        if len(segments) == 0:
+            return
+
+        ring = len(self.profile)
+        pixels, in_front = self.camera.project(vertices, camera_offset)
+
+        rings = np.round(pixels * (1 << SUBPIXEL_BITS)).astype(np.int32).reshape(-1, ring, 2)
+        visible = in_front.reshape(-1, ring).all(axis=1)
+        segments = segments[visible[segments] & visible[segments + 1]]
+
+        for i in segments:
+            hull = cv2.convexHull(rings[i:i + 2].reshape(-1, 2))
+            cv2.fillConvexPoly(mask, hull, 255, cv2.LINE_8, SUBPIXEL_BITS)
+
+
+def mask_iou(mask, reference, threshold=127):
+    """Intersection over union of two masks, 1.0 when both are empty."""
+    mask = mask > threshold
+    reference = reference > threshold
+    union = np.count_nonzero(mask | reference)
+    if union == 0:
+        return 1.0
+    return np.count_nonzero(mask & reference) / union
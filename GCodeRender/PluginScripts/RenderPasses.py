@@ -0,0 +1,189 @@
+import os
+
+import bpy
+import numpy as np
+
+
+HEAD_COLLECTION = "GCode_Head"
+LIGHTS_COLLECTION = "GCode_Lights"
+
+BED_LAYER = "GCode_Bed"
+MASK_LAYER = "GCode_Mask"
+
+OUTPUT_NODE = "GCode_Output"
+
+# File name prefix of every pass, in the order of the File Output node inputs
+PASS_PREFIXES = ("sim", "bed", "msk")
+
+# Render samples of the flat mask pass: a thresholded 1-bit mask needs a single one,
+# 8-bit masks keep some antialiasing on the edges
+BINARY_MASK_SAMPLES = 1
+MASK_SAMPLES = 16
+
+
+def _move_to_collection(obj, collection):
+    for user in list(obj.users_collection):
+        if user != collection:
+            user.objects.unlink(obj)
+    if obj.name not in collection.objects:
+        collection.objects.link(obj)
+
+
+def _collection(scene, name):
+    collection = bpy.data.collections.get(name)
+    if collection is None:
+        collection = bpy.data.collections.new(name)
+    if collection.name not in scene.collection.children:
+        scene.collection.children.link(collection)
+    return collection
+
+
+def setup_pass_collections(scene, head, lights):
+    """Give the head and the camera/light their own collections so view layers can exclude them."""
+    _move_to_collection(head, _collection(scene, HEAD_COLLECTION))
+
+    lights_collection = _collection(scene, LIGHTS_COLLECTION)
+    for obj in lights:
+        _move_to_collection(obj, lights_collection)
+
+
+def setup_view_layers(scene, mask_material):
+    """``(sim, bed, mask)`` view layers.
+
+    The scene's first view layer renders the full scene. ``GCode_Bed`` leaves
+    out the head, and ``GCode_Mask`` keeps only the layer collections and the
+    camera/light, drawn with ``mask_material``.
+    """
+    sim_layer = scene.view_layers[0]
+    bed_layer = scene.view_layers.get(BED_LAYER) or scene.view_layers.new(BED_LAYER)
+    mask_layer = scene.view_layers.get(MASK_LAYER) or scene.view_layers.new(MASK_LAYER)
+
+    for layer_collection in bed_layer.layer_collection.children:
+        layer_collection.exclude = layer_collection.name == HEAD_COLLECTION
+
+    for layer_collection in mask_layer.layer_collection.children:
+        name = layer_collection.name
+        layer_collection.exclude = not (name.startswith("Collection_") or name == LIGHTS_COLLECTION)
+
+    mask_layer.material_override = mask_material
+
+    for view_layer in scene.view_layers:
+        view_layer.use = view_layer in (sim_layer, bed_layer, mask_layer)
+
+    return sim_layer, bed_layer, mask_layer
+
+
+def set_mask_samples(mask_layer, mask_bits):
+    """Render the mask view layer with few samples instead of the scene's, see ``MASK_SAMPLES``.
+
+    The bed pass is a full render of the scene and keeps the scene's samples.
+    """
+    mask_layer.samples = BINARY_MASK_SAMPLES if mask_bits == 1 else MASK_SAMPLES
+
+
+def setup_file_output(scene, view_layers):
+    """Compositor File Output node writing every view layer's image in the same render."""
+    scene.use_nodes = True
+    scene.render.use_compositing = True
+    tree = scene.node_tree
+
+    output = tree.nodes.get(OUTPUT_NODE)
+    if output is None:
+        output = tree.nodes.new('CompositorNodeOutputFile')
+        output.name = OUTPUT_NODE
+        output.location = (600, -400)
+        output.file_slots.clear()
+        for prefix in PASS_PREFIXES:
+            output.file_slots.new(prefix)
+
+    for index, view_layer in enumerate(view_layers):
+        node_name = f"GCode_{PASS_PREFIXES[index]}_layer"
+        render_layers = tree.nodes.get(node_name)
+        if render_layers is None:
+            render_layers = tree.nodes.new('CompositorNodeRLayers')
+            render_layers.name = node_name
+            render_layers.location = (0, -400 - index * 300)
+        render_layers.layer = view_layer.name
+        tree.links.new(render_layers.outputs["Image"], output.inputs[index])
+
+    return output
+
+
+def output_file_paths(output, scene, dir_path, filename):
+    """Point the File Output slots at ``<prefix>_Z_lp<filename>`` and return ``(written, final)`` paths."""
+    output.base_path = dir_path
+    extension = scene.render.file_extension
+
+    # Follow the render profile's format, which can change between renders
+    image_settings = scene.render.image_settings
+    output.format.file_format = image_settings.file_format
+    output.format.color_mode = image_settings.color_mode
+    output.format.color_depth = image_settings.color_depth
+    output.format.compression = image_settings.compression
+    output.format.quality = image_settings.quality
+
+    paths = []
+    for prefix, slot in zip(PASS_PREFIXES, output.file_slots):
+        slot.path = f"{prefix}_Z_lp{filename}_"
+        # The File Output node always appends the frame number
+        written = os.path.join(dir_path, f"{slot.path}{scene.frame_current:04d}{extension}")
+        paths.append((written, os.path.join(dir_path, f"{prefix}_Z_lp{filename}{extension}")))
+    return paths
+
+
+VIEWER_NODE = "GCode_Viewer"
+DISPLAY_NODE = "GCode_Display"
+
+# Color space of each view transform, so the Viewer holds the pixels a saved render would
+VIEW_COLOR_SPACES = {'Standard': 'sRGB', 'Filmic': 'Filmic sRGB', 'AgX': 'AgX Base sRGB'}
+
+
+def setup_viewer(scene):
+    """Viewer node behind a view transform conversion, None when the view transform can't be reproduced.
+
+    ``bpy.data.images["Viewer Node"]`` then holds display-referred pixels of
+    the pass linked by :func:`link_viewer`.
+    """
+    view_settings = scene.view_settings
+    color_space = VIEW_COLOR_SPACES.get(view_settings.view_transform)
+    if color_space is None or view_settings.look not in ('None', '') \
+            or view_settings.exposure != 0 or view_settings.gamma != 1:
+        return None
+
+    tree = scene.node_tree
+    display = tree.nodes.get(DISPLAY_NODE)
+    if display is None:
+        display = tree.nodes.new('CompositorNodeConvertColorSpace')
+        display.name = DISPLAY_NODE
+        display.location = (600, -1000)
+    try:
+        display.to_color_space = color_space
+    except TypeError:
+        # The OCIO config has no such color space
+        return None
+
+    viewer = tree.nodes.get(VIEWER_NODE)
+    if viewer is None:
+        viewer = tree.nodes.new('CompositorNodeViewer')
+        viewer.name = VIEWER_NODE
+        viewer.location = (800, -1000)
+    tree.links.new(display.outputs["Image"], viewer.inputs["Image"])
+    return viewer
+
+
+def link_viewer(scene, prefix):
+    """Show the pass ``prefix`` in the Viewer node."""
+    tree = scene.node_tree
+    render_layers = tree.nodes[f"GCode_{prefix}_layer"]
+    tree.nodes[VIEWER_NODE].select = True
+    tree.nodes.active = tree.nodes[VIEWER_NODE]
+    tree.links.new(render_layers.outputs["Image"], tree.nodes[DISPLAY_NODE].inputs["Image"])
+
+
+def viewer_pixels():
+    """Copy of the Viewer node image as a ``(height, width, 4)`` float array, bottom row first."""
+    image = bpy.data.images["Viewer Node"]
+    width, height = image.size
+    pixels = np.empty(width * height * 4, dtype=np.float32)
+    image.pixels.foreach_get(pixels)
+    return pixels.reshape(height, width, 4)
@@ -0,0 +1,132 @@
+RESOLUTION = (1280, 720)
+
+# Settings left at None keep what the .blend has
+RENDER_PROFILES = {
+    "reference": {
+        "description": "Full resolution with the .blend's sampling, the images the defect API is tuned on",
+        "resolution_percentage": 100,
+        "samples": None,
+        "adaptive_threshold": None,
+        "denoise": None,
+        "max_bounces": None,
+        "file_format": 'PNG',
+        "color_depth": '8',
+        "compression": 15,
+        "quality": None,
+        "mask_bits": 8,
+    },
+    "preview": {
+        "description": "Half resolution, few adaptive samples, denoised and short light paths",
+        "resolution_percentage": 50,
+        "samples": 16,
+        "adaptive_threshold": 0.1,
+        "denoise": True,
+        "max_bounces": 2,
+        "file_format": 'PNG',
+        "color_depth": '8',
+        "compression": 0,
+        "quality": None,
+        "mask_bits": 1,
+    },
+}
+
+DEFAULT_PROFILE = "reference"
+
+# Output settings that can be changed on top of any profile
+FORMAT_OVERRIDES = ("file_format", "compression", "quality", "mask_bits")
+
+_BOUNCES = ("max_bounces", "diffuse_bounces", "glossy_bounces", "transmission_bounces", "volume_bounces")
+
+# Per scene: the .blend's or the user's own values of the settings a profile may change
+# ("baseline") and the values the last profile wrote ("written")
+_applied = {}
+
+
+def profile_items():
+    """``EnumProperty`` items of the render profiles."""
+    return [(name, name.capitalize(), profile["description"]) for name, profile in RENDER_PROFILES.items()]
+
+
+def profile_settings(name, overrides=None):
+    """The profile ``name`` with the non-None ``overrides`` of its output format applied."""
+    profile = dict(RENDER_PROFILES[name])
+    for key, value in (overrides or {}).items():
+        if key not in FORMAT_OVERRIDES:
+            raise KeyError(f"{key} is not an output format setting")
+        if value is not None:
+            profile[key] = value
+    return profile
+
+
+def apply_render_profile(scene, name, overrides=None):
+    """Set resolution, output format and sampling of ``scene`` from the profile ``name``."""
+    profile = profile_settings(name, overrides)
+    render = scene.render
+
+    render.resolution_x, render.resolution_y = RESOLUTION
+    render.resolution_percentage = profile["resolution_percentage"]
+
+    image_settings = render.image_settings
+    image_settings.file_format = profile["file_format"]
+    image_settings.color_depth = profile["color_depth"]
+    if profile["compression"] is not None:
+        image_settings.compression = profile["compression"]
+    if profile["quality"] is not None:
+        image_settings.quality = profile["quality"]
+
+    settings = _restorable_settings(scene)
+    baseline = _baseline(scene, settings)
+    # JPEG has no alpha, every other format gets the color mode back
+    values = {"color_mode": 'RGB' if profile["file_format"] == 'JPEG' else baseline["color_mode"]}
+    if render.engine == 'CYCLES':
+        values["samples"] = profile["samples"] if profile["samples"] is not None else baseline["samples"]
+        if profile["adaptive_threshold"] is not None:
+            values["use_adaptive_sampling"] = True
+            values["adaptive_threshold"] = profile["adaptive_threshold"]
+        else:
+            values["use_adaptive_sampling"] = baseline["use_adaptive_sampling"]
+            values["adaptive_threshold"] = baseline["adaptive_threshold"]
+        values["use_denoising"] = profile["denoise"] if profile["denoise"] is not None else baseline["use_denoising"]
+        for name in _BOUNCES:
+            values[name] = baseline[name]
+            if profile["max_bounces"] is not None:
+                values[name] = min(values[name], profile["max_bounces"])
+    else:
+        values["taa_render_samples"] = (profile["samples"] if profile["samples"] is not None
+                                        else baseline["taa_render_samples"])
+
+    written = {}
+    for key, value in values.items():
+        owner, attribute = settings[key]
+        setattr(owner, attribute, value)
+        # Read back, Blender stores floats in single precision
+        written[key] = getattr(owner, attribute)
+    _applied[scene.name] = {"baseline": baseline, "written": written}
+
+
+def _restorable_settings(scene):
+    """``{key: (owner, attribute)}`` of the settings a profile changes only for a while."""
+    settings = {"color_mode": (scene.render.image_settings, "color_mode")}
+    if scene.render.engine == 'CYCLES':
+        for name in ("samples", "use_adaptive_sampling", "adaptive_threshold", "use_denoising") + _BOUNCES:
+            settings[name] = (scene.cycles, name)
+    else:
+        settings["taa_render_samples"] = (scene.eevee, "taa_render_samples")
+    return settings
+
+
+def _baseline(scene, settings):
+    """The scene's own value of every setting.
+
+    A setting still holding what the last profile wrote keeps the value from
+    before that profile; anything else was set in the .blend or by the user
+    since, and becomes the new value to restore.
+    """
+    applied = _applied.get(scene.name, {"baseline": {}, "written": {}})
+    baseline = {}
+    for key, (owner, attribute) in settings.items():
+        value = getattr(owner, attribute)
+        if key in applied["baseline"] and key in applied["written"] and applied["written"][key] == value:
+            value = applied["baseline"][key]
+        baseline[key] = value
+    return baseline
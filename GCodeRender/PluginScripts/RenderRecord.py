@@ -0,0 +1,156 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+
+
+RECORD_NAME = "fingerprints.jsonl"
+IMAGE_PREFIXES = ("sim", "bed", "msk")
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp")
+
+
+def layer_fingerprints(toolpath, resolution=1e-4):
+    """Content hash of every M118 layer of ``toolpath``.
+
+    A layer is the extrusion between the previous marker and its own, with
+    coordinates quantized to ``resolution`` mm and path ids made relative, so
+    line numbers and travel moves do not matter. The head position at the
+    marker and the marker name are included because they change the render.
+    """
+    fingerprints = []
+    layers = toolpath.layers
+    for layer in range(len(layers)):
+        lo, hi = toolpath.layer_range(layer)
+        rows = np.flatnonzero(toolpath.extrude[lo:hi]) + lo
+
+        segments = np.concatenate((toolpath.start[rows], toolpath.end[rows]), axis=1)
+        paths = toolpath.path[rows]
+        if len(paths):
+            paths = paths - paths[0]
+
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(np.round(segments / resolution).astype(np.int64).tobytes())
+        digest.update(paths.astype(np.int32).tobytes())
+        digest.update(np.round(layers.head[layer] / resolution).astype(np.int64).tobytes())
+        digest.update(layers.name[layer].encode())
+        fingerprints.append(digest.hexdigest())
+
+    return fingerprints
+
+
+class RenderRecord:
+    """Fingerprints of the layers already rendered into an ``images_<timestamp>`` folder.
+
+    Stored as JSON lines in ``RECORD_NAME``: a header with the G-code file name
+    and the render settings, then one line per layer. Layers skipped by an lp
+    selection are kept with ``rendered`` false, so the layers rendered after
+    them can still be reused. Lines are keyed by layer, the render_pool
+    workers sharing a folder append to the same record.
+    """
+
+    def __init__(self, dir_path, gcode_name=None, settings=None):
+        self.dir_path = dir_path
+        self.gcode_name = gcode_name
+        self.settings = settings or {}
+        self.layers = []
+
+    @property
+    def path(self):
+        return os.path.join(self.dir_path, RECORD_NAME)
+
+    @classmethod
+    def load(cls, dir_path):
+        record = cls(dir_path)
+        try:
+            with open(record.path) as f:
+                header = json.loads(f.readline())
+                record.gcode_name = header["gcode_name"]
+                record.settings = header["settings"]
+                entries = {}
+                for line in f:
+                    entry = json.loads(line)
+                    rendered = entry.get("rendered", True)
+                    previous = entries.get(entry["layer"])
+                    if previous is None or rendered or not previous[2]:
+                        entries[entry["layer"]] = (entry["name"], entry["fingerprint"], rendered)
+        except (OSError, ValueError, KeyError):
+            return None
+
+        # A layer missing from the record has no fingerprint and never matches
+        record.layers = [entries.get(layer, (None, None, False)) for layer in range(max(entries, default=-1) + 1)]
+        return record
+
+    def _line(self, layer):
+        name, fingerprint, rendered = self.layers[layer]
+        return json.dumps({"layer": layer, "name": name, "fingerprint": fingerprint, "rendered": rendered}) + "\n"
+
+    def save(self):
+        os.makedirs(self.dir_path, exist_ok=True)
+        with open(self.path, "w") as f:
+            f.write(json.dumps({"gcode_name": self.gcode_name, "settings": self.settings}) + "\n")
+            for layer in range(len(self.layers)):
+                f.write(self._line(layer))
+
+    def append(self, layer, name, fingerprint, skipped=()):
+        """Record the render of ``layer``; ``skipped`` holds ``(name, fingerprint)`` of the unrendered layers before it."""
+        if layer < len(self.layers):
+            del self.layers[layer:]
+            self.save()
+        else:
+            os.makedirs(self.dir_path, exist_ok=True)
+            try:
+                # Another worker may have created the record already
+                with open(self.path, "x") as f:
+                    f.write(json.dumps({"gcode_name": self.gcode_name, "settings": self.settings}) + "\n")
+            except FileExistsError:
+                pass
+
+        first = len(self.layers)
+        self.layers.extend((skip_name, skip_fingerprint, False) for skip_name, skip_fingerprint in skipped)
+        self.layers.append((name, fingerprint, True))
+        if len(self.layers) != layer + 1:
+            raise ValueError(f"Layer {layer} recorded after {first} layers with {len(skipped)} skipped")
+
+        with open(self.path, "a") as f:
+            f.write("".join(self._line(index) for index in range(first, layer + 1)))
+
+    def first_changed_layer(self, fingerprints, wanted=None):
+        """Index of the first layer whose render cannot be reused.
+
+        That is a layer whose content changed, or one that was skipped but is
+        among the ``wanted`` layers now (every layer when None).
+        """
+        for layer, (_, fingerprint, rendered) in enumerate(self.layers):
+            if layer >= len(fingerprints) or fingerprints[layer] != fingerprint:
+                return layer
+            if not rendered and (wanted is None or layer in wanted):
+                return layer
+        return len(self.layers)
+
+    def truncate(self, layer):
+        """Forget layers from ``layer`` on and delete their images."""
+        for name, _, _ in self.layers[layer:]:
+            if name is None:
+                continue
+            for prefix in IMAGE_PREFIXES:
+                for extension in IMAGE_EXTENSIONS:
+                    image_path = os.path.join(self.dir_path, f"{prefix}_Z_lp{name}{extension}")
+                    if os.path.exists(image_path):
+                        os.remove(image_path)
+
+        del self.layers[layer:]
+        self.save()
+
+
+def find_previous_run(save_dir, gcode_name, settings):
+    """Most recent render folder in ``save_dir`` made from ``gcode_name`` with the same settings."""
+    if not os.path.isdir(save_dir):
+        return None
+
+    folders = sorted((name for name in os.listdir(save_dir) if name.startswith("images_")), reverse=True)
+    for name in folders:
+        record = RenderRecord.load(os.path.join(save_dir, name))
+        if record is not None and record.gcode_name == gcode_name and record.settings == settings:
+            return record
+    return None
@@ -0,0 +1,144 @@
+import contextlib
+import csv
+import json
+import os
+import sys
+import time
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+TELEMETRY_NAME = "telemetry"
+# Layer fields always present in the CSV, stage timings are appended as they appear
+LAYER_FIELDS = ("layer", "name", "timestamp", "total_seconds", "objects", "points", "rss_mb")
+
+_disabled_timer = contextlib.nullcontext()
+
+
+def rss_mb():
+    """Resident set size of this process in MB, the peak where the current one is unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class RenderTelemetry:
+    """Per-layer wall times, counts and RSS, appended to ``<name>.jsonl`` and ``<name>.csv``.
+
+    Stages are timed with ``with telemetry.timer("geometry"):``; repeated
+    stages within a layer add up. Work outside the layers, like parsing the
+    file, goes to the JSONL file through :meth:`event`. When disabled every
+    method returns at once and :meth:`timer` hands out a shared no-op context.
+    """
+
+    def __init__(self, enabled=False, average_window=10, name=TELEMETRY_NAME):
+        self.enabled = enabled
+        self.name = name
+        self.average_window = average_window
+        self.dir_path = None
+        self.layer_seconds = []
+        self._layer = None
+        self._start = 0
+        self._csv_fields = None
+
+    def set_output(self, dir_path):
+        if dir_path != self.dir_path:
+            self.dir_path = dir_path
+            self._csv_fields = None
+
+    @property
+    def jsonl_path(self):
+        return os.path.join(self.dir_path, f"{self.name}.jsonl")
+
+    @property
+    def csv_path(self):
+        return os.path.join(self.dir_path, f"{self.name}.csv")
+
+    def start_layer(self, layer, name):
+        if not self.enabled:
+            return
+        self._layer = {"layer": layer, "name": name}
+        self._start = time.perf_counter()
+
+    def timer(self, stage):
+        if not self.enabled or self._layer is None:
+            return _disabled_timer
+        return self._timer(stage)
+
+    @contextlib.contextmanager
+    def _timer(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            key = f"{stage}_seconds"
+            self._layer[key] = self._layer.get(key, 0.0) + time.perf_counter() - start
+
+    def set(self, **values):
+        if self.enabled and self._layer is not None:
+            self._layer.update(values)
+
+    def event(self, kind, **values):
+        if not self.enabled or self.dir_path is None:
+            return
+        os.makedirs(self.dir_path, exist_ok=True)
+        record = {"event": kind, "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), **values, "rss_mb": rss_mb()}
+        with open(self.jsonl_path, "a") as f:
+            f.write(json.dumps(record) + "\n")
+
+    def end_layer(self):
+        if not self.enabled or self._layer is None:
+            return
+
+        record = self._layer
+        self._layer = None
+        record["total_seconds"] = time.perf_counter() - self._start
+        record["timestamp"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+        record["rss_mb"] = rss_mb()
+        self.layer_seconds.append(record["total_seconds"])
+
+        if self.dir_path is None:
+            return
+        os.makedirs(self.dir_path, exist_ok=True)
+        with open(self.jsonl_path, "a") as f:
+            f.write(json.dumps(record) + "\n")
+        self._write_csv(record)
+
+    def _write_csv(self, record):
+        fields = list(LAYER_FIELDS) + sorted(key for key in record if key not in LAYER_FIELDS)
+        if self._csv_fields is None and os.path.exists(self.csv_path):
+            with open(self.csv_path, newline="") as f:
+                self._csv_fields = next(csv.reader(f), None)
+
+        if self._csv_fields is None or not set(fields) <= set(self._csv_fields):
+            # A new stage appeared, rewrite the file with the wider header
+            rows = []
+            if os.path.exists(self.csv_path):
+                with open(self.csv_path, newline="") as f:
+                    rows = list(csv.DictReader(f))
+            self._csv_fields = list(dict.fromkeys((self._csv_fields or []) + fields))
+            with open(self.csv_path, "w", newline="") as f:
+                writer = csv.DictWriter(f, fieldnames=self._csv_fields)
+                writer.writeheader()
+                writer.writerows(rows)
+
+        with open(self.csv_path, "a", newline="") as f:
+            csv.DictWriter(f, fieldnames=self._csv_fields).writerow(record)
+
+    def summary(self, remaining_layers):
+        """``(last, moving_average, eta)`` in seconds, or None before the first layer."""
+        if not self.layer_seconds:
+            return None
+        recent = self.layer_seconds[-self.average_window:]
+        average = sum(recent) / len(recent)
+        return self.layer_seconds[-1], average, average * remaining_layers
@@ -0,0 +1,56 @@
+import time
+
+import bpy
+
+
+class RenderTiming:
+    """Split render time into scene sync and sampling using the render handlers.
+
+    Render statistics mention samples once the engine is sampling (Cycles
+    ``Sample 3/64``, EEVEE ``Rendering 3 / 64 samples``); everything before,
+    and between the view layers of one render, counts as sync. Used as a
+    context manager around the renders of one layer; :attr:`last` then holds
+    ``(sync_seconds, sample_seconds)`` of that layer.
+    """
+
+    def __init__(self):
+        self.history = []
+        self.last = None
+        self._phase = None
+        self._since = 0
+        self._totals = {'sync': 0.0, 'sample': 0.0}
+
+    def __enter__(self):
+        self._totals = {'sync': 0.0, 'sample': 0.0}
+        bpy.app.handlers.render_pre.append(self._on_pre)
+        bpy.app.handlers.render_stats.append(self._on_stats)
+        bpy.app.handlers.render_post.append(self._on_post)
+        return self
+
+    def __exit__(self, *exc):
+        for handlers, handler in ((bpy.app.handlers.render_pre, self._on_pre),
+                                  (bpy.app.handlers.render_stats, self._on_stats),
+                                  (bpy.app.handlers.render_post, self._on_post)):
+            if handler in handlers:
+                handlers.remove(handler)
+
+        self.last = (self._totals['sync'], self._totals['sample'])
+        self.history.append(self.last)
+        return False
+
+    def _advance(self, phase):
+        now = time.perf_counter()
+        if self._phase is not None:
+            self._totals[self._phase] += now - self._since
+        self._phase = phase
+        self._since = now
+
+    def _on_pre(self, scene, *args):
+        self._phase = None
+        self._advance('sync')
+
+    def _on_stats(self, stats, *args):
+        self._advance('sample' if 'sample' in stats.lower() else 'sync')
+
+    def _on_post(self, scene, *args):
+        self._advance(None)
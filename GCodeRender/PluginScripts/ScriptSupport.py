@@ -0,0 +1,19 @@
+import sys
+
+from Toolpath import bed_origin
+
+
+# Head origin of the standalone scripts, the same bed GCodeParser starts on by default
+ORIGIN = bed_origin()
+
+
+def script_args():
+    """Arguments of a standalone script.
+
+    Blender passes the script's own arguments after ``--``; inside Blender
+    without one there are none, in plain Python they are ``sys.argv[1:]``.
+    """
+    argv = sys.argv
+    if "--" in argv:
+        return argv[argv.index("--") + 1:]
+    return [] if "bpy" in sys.modules else argv[1:]
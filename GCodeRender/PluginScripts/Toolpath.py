@@ -0,0 +1,394 @@
+from array import array
+
+import numpy as np
+
+from GCodeTokenizer import MARKER, MOVE, SET_POSITION, tokenize
+
+
+# GCodeParser's default bed in cm, the head starts at its centre
+BED_SIZE = 35
+
+# Array columns of a Toolpath and of its LayerIndex (``name`` is a list of strings)
+SEGMENT_COLUMNS = ("start", "end", "extrude", "layer", "line", "path")
+LAYER_COLUMNS = ("line", "head", "e")
+
+
+def bed_origin(bed_size=BED_SIZE):
+    """Head position before the first move, the centre of a ``bed_size`` cm bed in mm."""
+    half = bed_size * 10 / 2
+    return (half, half, 0)
+
+
+class ToolpathState:
+    """Modal printer state carried from one G-code line to the next."""
+
+    def __init__(self, head=(0, 0, 0)):
+        self.head = [float(v) for v in head]
+        self.last_e = 0.0
+        self.layer = 0
+        self.path = -1
+        self.path_end = None
+        self.path_count = 0
+
+    def close_path(self):
+        self.path = -1
+        self.path_end = None
+
+
+class LayerIndex:
+    """Line and modal state of every M118 layer marker.
+
+    ``line`` is the marker's line number, ``name`` the render name taken from
+    the marker text, and ``head``/``e`` hold the head position and last
+    extruding E when the marker is reached, which is the state the next layer
+    starts from. Both are float64: E is compared exactly against the next
+    moves, so a rounded value would turn a move at the same E into extrusion.
+    """
+
+    def __init__(self, line, name, head, e):
+        self.line = line
+        self.name = name
+        self.head = head
+        self.e = e
+
+    def __len__(self):
+        return len(self.line)
+
+    def next_marker(self, line_num):
+        """Index of the first marker at or after ``line_num``, or ``len(self)``.
+
+        This is also the number of layers completed once parsing reaches ``line_num``.
+        """
+        return int(np.searchsorted(self.line, line_num, side='left'))
+
+    def layer_start(self, layer):
+        """First line of ``layer`` (0 is everything before the first marker)."""
+        if layer <= 0:
+            return 0
+        return int(self.line[min(layer, len(self)) - 1]) + 1
+
+    def state(self, layer, origin=(0, 0, 0)):
+        """:class:`ToolpathState` to resume parsing at :meth:`layer_start`."""
+        if layer <= 0:
+            return ToolpathState(origin)
+
+        state = ToolpathState(self.head[layer - 1])
+        state.last_e = float(self.e[layer - 1])
+        state.layer = layer
+        return state
+
+
+class Toolpath:
+    """Columnar result of a toolpath parse.
+
+    One row per G0/G1 move: ``start``/``end`` (float32, N x 3), ``extrude``
+    (bool), ``layer`` (int32, number of M118 markers seen before the move),
+    ``line`` (int32, source line) and ``path`` (int32, extrusion path id or -1
+    for travel). Extruding rows of one path chain end to start, so a path's
+    points are the start of its first row followed by the end of every row.
+    ``layers`` is the :class:`LayerIndex` built during the same pass.
+    """
+
+    def __init__(self, start, end, extrude, layer, line, path, layers, line_count):
+        self.start = start
+        self.end = end
+        self.extrude = extrude
+        self.layer = layer
+        self.line = line
+        self.path = path
+        self.layers = layers
+        self.line_count = line_count
+
+    def __len__(self):
+        return len(self.line)
+
+    @property
+    def layer_count(self):
+        return len(self.layers)
+
+    def segment_range(self, first_line, stop_line):
+        """Row range ``[lo, hi)`` of the moves on lines ``first_line <= line < stop_line``."""
+        lo = int(np.searchsorted(self.line, first_line, side='left'))
+        hi = int(np.searchsorted(self.line, stop_line, side='left'))
+        return lo, hi
+
+    def layer_range(self, layer):
+        """Row range ``[lo, hi)`` of the moves between marker ``layer - 1`` and ``layer``."""
+        lo = int(np.searchsorted(self.layer, layer, side='left'))
+        hi = int(np.searchsorted(self.layer, layer, side='right'))
+        return lo, hi
+
+    def iter_paths(self, lo, hi):
+        """Yield ``(path_id, points)`` for every extrusion path within rows ``[lo, hi)``."""
+        rows = np.flatnonzero(self.path[lo:hi] >= 0) + lo
+        if len(rows) == 0:
+            return
+
+        ids = self.path[rows]
+        breaks = np.flatnonzero(ids[1:] != ids[:-1]) + 1
+        for group in np.split(rows, breaks):
+            points = np.empty((len(group) + 1, 3), dtype=np.float32)
+            points[0] = self.start[group[0]]
+            points[1:] = self.end[group]
+            yield int(self.path[group[0]]), points
+
+
+_X, _Y, _Z, _E = b'XYZE'
+
+
+def _parse_params(line):
+    x = y = z = e = None
+    for param in line.split(b';', 1)[0].split():
+        if len(param) == 1:
+            continue
+        axis = param[0]
+        if axis == _X:
+            x = float(param[1:])
+        elif axis == _Y:
+            y = float(param[1:])
+        elif axis == _Z:
+            z = float(param[1:])
+        elif axis == _E:
+            e = float(param[1:])
+    return x, y, z, e
+
+
+def marker_name(line):
+    """Render name of an M118 marker, e.g. ``b'M118 e_pos:0.193798,52'`` -> ``'0.193798'``."""
+    return line.split(b":")[1].split(b",")[0].strip().decode('ascii', 'replace')
+
+
+def parse_toolpath(lines, origin=(0, 0, 0), state=None, first_line=0):
+    """Stream G-code ``lines`` (``bytes``, e.g. ``GCodeFile.iter_lines()``) once
+    and return a :class:`Toolpath`.
+
+    The extrusion rules are the ones ``GCodeParser.parse_gcode`` has always
+    used: a move extrudes when its E is above the last extruding E, a lower E,
+    a move without E, ``G92 E0`` and every M118 marker end the current path.
+    ``first_line`` is the line number of ``lines[0]``, so a single layer can be
+    walked from ``LayerIndex.state``.
+    """
+    if state is None:
+        state = ToolpathState(origin)
+
+    start = array('f')
+    end = array('f')
+    extrude = array('b')
+    layer = array('i')
+    line_idx = array('i')
+    path = array('i')
+    marker_line = array('i')
+    marker_names = []
+    marker_head = array('d')
+    marker_e = array('d')
+
+    line_count = 0
+    for idx, line in enumerate(lines, first_line):
+        line_count += 1
+
+        if line.startswith(b'M118'):
+            state.close_path()
+            state.layer += 1
+            marker_line.append(idx)
+            marker_names.append(marker_name(line))
+            marker_head.extend(state.head)
+            marker_e.append(state.last_e)
+            continue
+
+        is_move = line.startswith(b'G0') or line.startswith(b'G1')
+        if not is_move and not line.startswith(b'G92'):
+            continue
+
+        x, y, z, e = _parse_params(line)
+
+        if not is_move:
+            if e == 0:
+                state.last_e = 0.0
+                state.close_path()
+            continue
+
+        head = state.head
+        new_head = [head[0] if x is None else x,
+                    head[1] if y is None else y,
+                    head[2] if z is None else z]
+
+        seg_start = head
+        seg_path = -1
+        if e is not None and e - state.last_e > 0:
+            state.last_e = e
+            if state.path < 0:
+                state.path = state.path_count
+                state.path_count += 1
+            else:
+                seg_start = state.path_end
+            seg_path = state.path
+            state.path_end = new_head
+        elif e is None or e - state.last_e < 0:
+            state.close_path()
+
+        start.extend(seg_start)
+        end.extend(new_head)
+        extrude.append(seg_path >= 0)
+        layer.append(state.layer)
+        line_idx.append(idx)
+        path.append(seg_path)
+
+        state.head = new_head
+
+    return Toolpath(
+        start=np.frombuffer(start, dtype=np.float32).reshape(-1, 3),
+        end=np.frombuffer(end, dtype=np.float32).reshape(-1, 3),
+        extrude=np.frombuffer(extrude, dtype=np.int8).astype(bool),
+        layer=np.frombuffer(layer, dtype=np.int32),
+        line=np.frombuffer(line_idx, dtype=np.int32),
+        path=np.frombuffer(path, dtype=np.int32),
+        layers=LayerIndex(
+            line=np.frombuffer(marker_line, dtype=np.int32),
+            name=marker_names,
+            head=np.frombuffer(marker_head, dtype=np.float64).reshape(-1, 3),
+            e=np.frombuffer(marker_e, dtype=np.float64),
+        ),
+        line_count=line_count,
+    )
+
+
+def build_toolpath(columns, names, state=None, line_count=0):
+    """Vectorized counterpart of :func:`parse_toolpath` over tokenized ``columns``.
+
+    ``columns`` comes from ``GCodeTokenizer.tokenize``, forward-filled from
+    ``state.head``; ``names`` are the render names of its M118 rows. The last
+    extruding E is a running maximum that ``G92 E0`` resets, so the extrusion
+    rules reduce to prefix scans. ``state`` is advanced to the end of the range.
+    """
+    if state is None:
+        state = ToolpathState()
+
+    kind = columns.kind
+    e = columns.e
+    rows = len(kind)
+    has_e = ~np.isnan(e)
+    is_move = kind == MOVE
+    is_marker = kind == MARKER
+    is_reset = (kind == SET_POSITION) & (e == 0)
+
+    # last_e after every row is the running max of E since the last G92 E0.
+    e_after = np.where(is_move & has_e, e, -np.inf)
+    e_after[is_reset] = 0.0
+    bounds = np.concatenate(([0], np.flatnonzero(is_reset), [rows]))
+    for lo, hi in zip(bounds[:-1], bounds[1:]):
+        np.maximum.accumulate(e_after[lo:hi], out=e_after[lo:hi])
+    e_after[:bounds[1]] = np.maximum(e_after[:bounds[1]], state.last_e)
+    last_e = np.concatenate(([state.last_e], e_after[:-1]))
+
+    extrudes = is_move & has_e & (e > last_e)
+    retracts = is_move & has_e & (e < last_e)
+    closes = np.cumsum(is_reset | is_marker | (is_move & ~has_e) | retracts)
+
+    xyz = np.column_stack((columns.x, columns.y, columns.z))
+    head_before = np.concatenate(([state.head], xyz[:-1]))
+    seg_start = head_before.copy()
+    path = np.full(rows, -1, dtype=np.int32)
+
+    ext_rows = np.flatnonzero(extrudes)
+    path_count = state.path_count
+    if len(ext_rows):
+        ext_closes = closes[ext_rows]
+        new_path = np.concatenate(([True], ext_closes[1:] != ext_closes[:-1]))
+        continues = state.path >= 0 and ext_closes[0] == 0
+        if continues:
+            new_path[0] = False
+
+        path_index = np.cumsum(new_path)
+        path[ext_rows] = np.where(path_index == 0, state.path, path_index - 1 + state.path_count)
+        path_count += int(path_index[-1])
+
+        chained = ext_rows[1:][~new_path[1:]]
+        seg_start[chained] = xyz[ext_rows[:-1][~new_path[1:]]]
+        if continues:
+            seg_start[ext_rows[0]] = state.path_end
+
+    moves = np.flatnonzero(is_move)
+    markers = np.flatnonzero(is_marker)
+    toolpath = Toolpath(
+        start=seg_start[moves].astype(np.float32),
+        end=xyz[moves].astype(np.float32),
+        extrude=extrudes[moves],
+        layer=(state.layer + np.cumsum(is_marker)[moves]).astype(np.int32),
+        line=columns.line[moves],
+        path=path[moves],
+        layers=LayerIndex(
+            line=columns.line[markers],
+            name=list(names),
+            head=xyz[markers].astype(np.float64),
+            e=last_e[markers].astype(np.float64),
+        ),
+        line_count=line_count,
+    )
+
+    if rows:
+        state.head = xyz[-1].tolist()
+        state.last_e = float(e_after[-1])
+        state.layer += len(markers)
+        state.path_count = path_count
+        open_path = closes[-1] == (closes[ext_rows[-1]] if len(ext_rows) else -1)
+        if len(ext_rows) and open_path:
+            state.path = int(path[ext_rows[-1]])
+            state.path_end = xyz[ext_rows[-1]].tolist()
+        elif len(ext_rows) or closes[-1] > 0:
+            state.close_path()
+
+    return toolpath
+
+
+def parse_buffer(gcode_file, origin=(0, 0, 0), start_line=0, stop_line=None, state=None):
+    """Tokenize and build the toolpath of a :class:`GCodeFile` range in bulk."""
+    if state is None:
+        state = ToolpathState(origin)
+
+    columns = tokenize(gcode_file.buffer, gcode_file.line_offsets,
+                       start_line, stop_line, origin=state.head)
+    names = [marker_name(gcode_file.line(line)) for line in columns.line[columns.kind == MARKER]]
+    stop_line = len(gcode_file) if stop_line is None else min(stop_line, len(gcode_file))
+    return build_toolpath(columns, names, state, line_count=stop_line - start_line)
+
+
+def simplify_points(points, tolerance):
+    """Douglas-Peucker keep mask for one polyline, all open spans split per pass.
+
+    A point is dropped when it lies within ``tolerance`` (chord distance, in
+    the units of ``points``) of the segment joining the kept points around it.
+    The end points are always kept, so closed paths stay closed.
+    """
+    count = len(points)
+    keep = np.zeros(count, dtype=bool)
+    keep[0] = keep[-1] = True
+    if count < 3 or tolerance <= 0:
+        keep[:] = True
+        return keep
+
+    points = np.asarray(points, dtype=np.float64)
+    idx = np.arange(count)
+    while True:
+        kept = np.flatnonzero(keep)
+        span = np.searchsorted(kept, idx, side='right') - 1
+        span[-1] = len(kept) - 2
+        a = points[kept[span]]
+        b = points[kept[span + 1]]
+
+        chord = b - a
+        length2 = np.einsum('ij,ij->i', chord, chord)
+        t = np.einsum('ij,ij->i', points - a, chord) / np.where(length2 > 0, length2, 1)
+        t = np.clip(t, 0, 1)
+        offset = points - (a + chord * t[:, None])
+        dist = np.einsum('ij,ij->i', offset, offset)
+        dist[keep] = -1
+
+        # Farthest point of every span, split the spans where it is too far
+        order = np.lexsort((-dist, span))
+        first = np.concatenate(([True], span[order][1:] != span[order][:-1]))
+        farthest = order[first]
+        split = farthest[dist[farthest] > tolerance * tolerance]
+        if len(split) == 0:
+            return keep
+
+        keep[split] = True
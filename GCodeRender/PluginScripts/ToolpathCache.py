@@ -0,0 +1,108 @@
+import hashlib
+import os
+import time
+import zipfile
+
+import numpy as np
+
+from Toolpath import LAYER_COLUMNS, SEGMENT_COLUMNS, LayerIndex, Toolpath
+
+
+CACHE_VERSION = 2
+
+
+class ToolpathCache:
+    """Parsed toolpaths stored as ``.npz`` files in ``cache_dir``.
+
+    Entries are keyed by the G-code content hash, the bead geometry
+    (``layer_height``/``layer_width``) and the head origin, so renders that
+    only change camera, light or material settings reuse the parse. The
+    oldest entries are evicted once the folder grows past ``max_bytes``, and
+    entries older than ``max_age`` seconds are dropped.
+    """
+
+    def __init__(self, cache_dir, max_bytes=512 * 1024 * 1024, max_age=30 * 24 * 3600):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+
+    @staticmethod
+    def content_hash(buffer):
+        return hashlib.sha1(buffer).hexdigest()
+
+    def key(self, content_hash, layer_height, layer_width, origin):
+        origin = ",".join(f"{v:.4f}" for v in origin)
+        params = f"v{CACHE_VERSION}|{layer_height:.4f}|{layer_width:.4f}|{origin}"
+        return f"{content_hash}_{hashlib.sha1(params.encode()).hexdigest()[:12]}"
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"toolpath_{key}.npz")
+
+    def load(self, key):
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                layers = LayerIndex(name=data["layers_name"].tolist(),
+                                    **{name: data[f"layers_{name}"] for name in LAYER_COLUMNS})
+                toolpath = Toolpath(layers=layers, line_count=int(data["line_count"]),
+                                    **{name: data[name] for name in SEGMENT_COLUMNS})
+        except (OSError, KeyError, ValueError, EOFError, zipfile.BadZipFile) as e:
+            # A truncated or foreign file, drop it so the next parse stores a good one
+            print(f"Removing unreadable toolpath cache {path}: {e}")
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+
+        os.utime(path)
+        return toolpath
+
+    def store(self, key, toolpath):
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        arrays = {name: getattr(toolpath, name) for name in SEGMENT_COLUMNS}
+        arrays.update({f"layers_{name}": getattr(toolpath.layers, name) for name in LAYER_COLUMNS})
+        arrays["layers_name"] = np.array(toolpath.layers.name, dtype=str)
+        arrays["line_count"] = np.int64(toolpath.line_count)
+
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+        try:
+            np.savez(tmp_path, **arrays)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        self.evict()
+
+    def entries(self):
+        if not os.path.isdir(self.cache_dir):
+            return []
+
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.startswith("toolpath_") and name.endswith(".npz") and ".tmp" not in name:
+                stat = os.stat(os.path.join(self.cache_dir, name))
+                entries.append((stat.st_mtime, stat.st_size, name))
+        return sorted(entries)
+
+    def evict(self):
+        now = time.time()
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+
+        for mtime, size, name in entries:
+            if total <= self.max_bytes and now - mtime <= self.max_age:
+                continue
+
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+                total -= size
+            except OSError:
+                pass
@@ -0,0 +1,110 @@
+import bpy
+import numpy as np
+
+from ExtrusionMesh import path_polylines
+
+
+NODE_GROUP_NAME = "GCode_Toolpath"
+MODIFIER_NAME = "GCode_Toolpath"
+LAYER_ATTRIBUTE = "layer"
+
+MAX_LAYER_INPUT = "Max Layer"
+PROFILE_INPUT = "Profile"
+MATERIAL_INPUT = "Material"
+
+
+def toolpath_node_group(name=NODE_GROUP_NAME):
+    """Geometry Nodes group that sweeps the toolpath polylines up to ``Max Layer``.
+
+    Points whose ``layer`` attribute is above ``Max Layer`` are deleted, the
+    remaining edges are turned into curves and swept with the ``Profile``
+    curve object (the elliptical bevel), and ``Material`` is assigned.
+    """
+    group = bpy.data.node_groups.get(name)
+    if group is not None:
+        return group
+
+    group = bpy.data.node_groups.new(name, 'GeometryNodeTree')
+    interface = group.interface
+    interface.new_socket("Geometry", in_out='INPUT', socket_type='NodeSocketGeometry')
+    interface.new_socket(MAX_LAYER_INPUT, in_out='INPUT', socket_type='NodeSocketInt')
+    interface.new_socket(PROFILE_INPUT, in_out='INPUT', socket_type='NodeSocketObject')
+    interface.new_socket(MATERIAL_INPUT, in_out='INPUT', socket_type='NodeSocketMaterial')
+    interface.new_socket("Geometry", in_out='OUTPUT', socket_type='NodeSocketGeometry')
+
+    nodes = group.nodes
+    links = group.links
+    group_input = nodes.new('NodeGroupInput')
+    group_output = nodes.new('NodeGroupOutput')
+
+    layer = nodes.new('GeometryNodeInputNamedAttribute')
+    layer.data_type = 'INT'
+    layer.inputs["Name"].default_value = LAYER_ATTRIBUTE
+
+    compare = nodes.new('FunctionNodeCompare')
+    compare.data_type = 'INT'
+    compare.operation = 'GREATER_THAN'
+
+    delete = nodes.new('GeometryNodeDeleteGeometry')
+    delete.domain = 'POINT'
+
+    to_curve = nodes.new('GeometryNodeMeshToCurve')
+    profile = nodes.new('GeometryNodeObjectInfo')
+    to_mesh = nodes.new('GeometryNodeCurveToMesh')
+    to_mesh.inputs["Fill Caps"].default_value = True
+    set_material = nodes.new('GeometryNodeSetMaterial')
+
+    # The integer A/B sockets of the compare node follow the float ones
+    links.new(layer.outputs["Attribute"], compare.inputs[2])
+    links.new(group_input.outputs[MAX_LAYER_INPUT], compare.inputs[3])
+    links.new(group_input.outputs["Geometry"], delete.inputs["Geometry"])
+    links.new(compare.outputs["Result"], delete.inputs["Selection"])
+    links.new(delete.outputs["Geometry"], to_curve.inputs["Mesh"])
+    links.new(group_input.outputs[PROFILE_INPUT], profile.inputs["Object"])
+    links.new(to_curve.outputs["Curve"], to_mesh.inputs["Curve"])
+    links.new(profile.outputs["Geometry"], to_mesh.inputs["Profile Curve"])
+    links.new(to_mesh.outputs["Mesh"], set_material.inputs["Geometry"])
+    links.new(group_input.outputs[MATERIAL_INPUT], set_material.inputs["Material"])
+    links.new(set_material.outputs["Geometry"], group_output.inputs["Geometry"])
+
+    for x, node in enumerate((group_input, layer, compare, delete, to_curve, profile, to_mesh, set_material, group_output)):
+        node.location = (x * 200, 0)
+
+    return group
+
+
+def create_toolpath_object(name, paths, path_layers, collection, profile_obj, material):
+    """Object holding every path of the print as polylines with a per-point ``layer`` attribute."""
+    vertices, edges, counts = path_polylines(paths)
+
+    mesh_data = bpy.data.meshes.new(name)
+    mesh_data.vertices.add(len(vertices))
+    mesh_data.vertices.foreach_set("co", vertices.ravel())
+    mesh_data.edges.add(len(edges))
+    mesh_data.edges.foreach_set("vertices", edges.ravel())
+    mesh_data.update()
+
+    layer_attribute = mesh_data.attributes.new(LAYER_ATTRIBUTE, 'INT', 'POINT')
+    layer_attribute.data.foreach_set("value", np.repeat(np.asarray(path_layers, dtype=np.int32), counts))
+    mesh_data.materials.append(material)
+
+    toolpath_obj = bpy.data.objects.new(name, mesh_data)
+    collection.objects.link(toolpath_obj)
+
+    modifier = toolpath_obj.modifiers.new(MODIFIER_NAME, 'NODES')
+    modifier.node_group = toolpath_node_group()
+    set_toolpath_input(toolpath_obj, PROFILE_INPUT, profile_obj)
+    set_toolpath_input(toolpath_obj, MATERIAL_INPUT, material)
+    set_toolpath_input(toolpath_obj, MAX_LAYER_INPUT, -1)
+
+    return toolpath_obj
+
+
+def set_toolpath_input(toolpath_obj, name, value):
+    modifier = toolpath_obj.modifiers[MODIFIER_NAME]
+    identifier = modifier.node_group.interface.items_tree[name].identifier
+    if modifier[identifier] == value:
+        return
+
+    modifier[identifier] = value
+    toolpath_obj.update_tag()
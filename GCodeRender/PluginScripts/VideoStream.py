@@ -0,0 +1,146 @@
+import os
+import shutil
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import cv2
+except ImportError:
+    cv2 = None
+
+from ImageWriter import to_image
+
+
+VIDEO_ENCODERS = ('ffmpeg', 'cv2')
+
+
+def encoder_error(encoder):
+    """Why ``encoder`` can't stream videos on this machine, None when it can."""
+    if cv2 is None:
+        return "Video streaming needs OpenCV (opencv-python)"
+    if encoder == 'ffmpeg' and shutil.which("ffmpeg") is None:
+        return "ffmpeg was not found on PATH"
+    return None
+
+
+def video_path(dir_path, prefix, suffix=""):
+    """``videos/video_<prefix>_<images folder><suffix>.mp4`` beside the image folder, as video_creator names them."""
+    dir_path = os.path.normpath(dir_path)
+    return os.path.join(os.path.dirname(dir_path), "videos", f"video_{prefix}_{os.path.basename(dir_path)}{suffix}.mp4")
+
+
+class VideoStream:
+    """One MP4 fed frame by frame, through an ``ffmpeg`` pipe or a ``cv2.VideoWriter``.
+
+    The encoder starts with the first frame, which sets the video size.
+    Frames are converted and encoded in order on one background thread;
+    :meth:`write` blocks once ``max_pending`` frames are waiting.
+    """
+
+    def __init__(self, path, fps=30, encoder='ffmpeg', crf=18, max_pending=8):
+        error = encoder_error(encoder)
+        if error is not None:
+            raise RuntimeError(error)
+
+        self.path = path
+        self.fps = fps
+        self.encoder = encoder
+        self.crf = crf
+        self.size = None
+        self.frames = 0
+        self.process = None
+        self.writer = None
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="VideoStream")
+        self.slots = threading.BoundedSemaphore(max_pending)
+        self.error = None
+
+    def _open(self, width, height):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        if self.encoder == 'ffmpeg':
+            command = ["ffmpeg", "-y", "-loglevel", "error",
+                       "-f", "rawvideo", "-pix_fmt", "bgr24", "-s", f"{width}x{height}", "-r", str(self.fps), "-i", "-",
+                       "-c:v", "libx264", "-crf", str(self.crf), "-pix_fmt", "yuv420p", self.path]
+            self.process = subprocess.Popen(command, stdin=subprocess.PIPE)
+        else:
+            self.writer = cv2.VideoWriter(self.path, cv2.VideoWriter_fourcc(*'mp4v'), self.fps, (width, height))
+            if not self.writer.isOpened():
+                raise OSError(f"Could not open {self.path} for writing")
+        self.size = (width, height)
+
+    def write(self, pixels, mask_bits=None):
+        """Queue Blender float pixels (bottom row first, RGBA) as the next frame."""
+        if self.error is not None:
+            raise self.error
+
+        self.slots.acquire()
+        try:
+            future = self.executor.submit(self._write, pixels, mask_bits)
+        except BaseException:
+            self.slots.release()
+            raise
+        future.add_done_callback(lambda _: self.slots.release())
+
+    def _write(self, pixels, mask_bits):
+        if self.error is not None:
+            return
+        try:
+            frame = to_image(pixels, 'RGB', mask_bits)
+            if frame.ndim == 2:
+                frame = cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
+
+            height, width = frame.shape[:2]
+            if self.size is None:
+                self._open(width, height)
+            elif self.size != (width, height):
+                raise ValueError(f"{self.path}: frame size {width}x{height} differs from {self.size[0]}x{self.size[1]}")
+
+            if self.process is not None:
+                self.process.stdin.write(frame.tobytes())
+            else:
+                self.writer.write(frame)
+            self.frames += 1
+        except Exception as e:
+            self.error = e
+
+    def close(self):
+        """Encode the queued frames and finish the file."""
+        self.executor.shutdown(wait=True)
+        if self.process is not None:
+            self.process.stdin.close()
+            if self.process.wait() != 0 and self.error is None:
+                self.error = RuntimeError(f"ffmpeg failed to write {self.path}")
+        if self.writer is not None:
+            self.writer.release()
+        if self.error is not None:
+            raise self.error
+
+
+class VideoStreams:
+    """A :class:`VideoStream` per render pass prefix, named after the image folder."""
+
+    def __init__(self, dir_path, fps=30, encoder='ffmpeg', suffix=""):
+        self.dir_path = dir_path
+        self.fps = fps
+        self.encoder = encoder
+        self.suffix = suffix
+        self.streams = {}
+
+    def write(self, prefix, pixels, mask_bits=None):
+        stream = self.streams.get(prefix)
+        if stream is None:
+            stream = VideoStream(video_path(self.dir_path, prefix, self.suffix), self.fps, self.encoder)
+            self.streams[prefix] = stream
+        stream.write(pixels, mask_bits)
+
+    def close(self):
+        error = None
+        for prefix, stream in self.streams.items():
+            try:
+                stream.close()
+                print(f"{prefix}: {stream.frames} frames written to {stream.path}")
+            except Exception as e:
+                error = error or e
+        self.streams = {}
+        if error is not None:
+            raise error
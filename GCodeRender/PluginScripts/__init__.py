@@ -8,6 +8,8 @@ if plugin_path not in sys.path:
 
 
 from GCodeParser import GCodeParser
+from LayerSelection import read_lp_list
+from RenderProfiles import DEFAULT_PROFILE, profile_items
 import functools
 import bpy
 import functools
@@ -45,6 +47,7 @@ from bpy.types import (Panel,
 gcode = GCodeParser(context=None)
 # print(gcode.dir_path)
 gcode_init = False
+memory_stats = None
 
 def render_with_delay(settings):       
     global gcode
@@ -54,14 +57,21 @@ def render_with_delay(settings):
     rendering = settings.rendering
 
     current_line = settings.current_line
+    if render:
+        # Layers nobody asked a render for are built in bulk
+        current_line = gcode.skip_unrendered(current_line)
     newLine = gcode.parse_gcode(current_line,render=render,hide_new_collection=hide_collection)
     print(f"{current_line} - {newLine}")
     
     settings.current_line = newLine
 
     if newLine == 0 or not rendering:
+        gcode.flush_writes()
+        gcode.finish_videos()
         for col in gcode.collections:
             col.hide_viewport = False
+        if gcode.frozen_collection is not None:
+            gcode.frozen_collection.hide_viewport = False
         return None
     
     return 0.001
@@ -91,6 +101,14 @@ class ReadGCodeOperator_Full(bpy.types.Operator):
             if len(gcode.lines) > 0:
                 my_settings.rendering = True
 
+                if my_settings.enable_render and my_settings.incremental_render:
+                    first_changed = gcode.start_incremental()
+                    self.report({'INFO'}, f"Rendering from layer {first_changed}")
+                else:
+                    gcode.render_from_layer = 0
+                if gcode.video_error is not None:
+                    self.report({'WARNING'}, f"{gcode.video_error}, videos are off")
+
                 bpy.app.timers.register(functools.partial(render_with_delay, my_settings))
                 
                 self.report({'INFO'}, "End of GCode file reached.")
@@ -118,6 +136,7 @@ class ReadGCodeOperator_Line(bpy.types.Operator):
             load_gcodefile(my_settings)
 
             newLine = gcode.parse_gcode(my_settings.current_line,render=my_settings.enable_render, hide_new_collection= my_settings.hide_collection)
+            gcode.flush_writes()
             print(f"{my_settings.current_line} - {newLine}")
             my_settings.current_line = newLine
             
@@ -156,6 +175,20 @@ class GCodeReset(bpy.types.Operator):
             my_settings.layer_height = 0.2
             my_settings.light_power = 1200 * 1000
             my_settings.material_selector = "FilamentMat"
+            my_settings.simplify_tolerance = 0
+            my_settings.geometry_mode = 'CURVE'
+            my_settings.incremental_render = False
+            my_settings.single_render = True
+            my_settings.render_profile = DEFAULT_PROFILE
+            my_settings.render_lps = ""
+            my_settings.persistent_data = False
+            my_settings.telemetry = False
+            my_settings.async_write = False
+            my_settings.mask_bits = 'PROFILE'
+            my_settings.video_stream = 'NONE'
+            my_settings.write_images = True
+            my_settings.freeze_every = 0
+            my_settings.freeze_points = 0
             # my_settings.file_path = os.getcwd()
             # my_settings.save_path = os.getcwd()
 
@@ -170,6 +203,17 @@ class GCodeReset(bpy.types.Operator):
             self.report({'ERROR'}, f"Error: {str(e)}")
             return {'CANCELLED'}
 
+class MemoryReport(Operator):
+    """Count the GCode datablocks in this session and estimate their size"""
+    bl_idname = "wm.gcode_memory_report"
+    bl_label = "Memory Report"
+
+    def execute(self, context):
+        global memory_stats
+        memory_stats = gcode.memory_report()
+        self.report({'INFO'}, f"{memory_stats['objects']} objects, {memory_stats['bytes'] / (1024 * 1024):.1f} MB")
+        return {'FINISHED'}
+
 def on_setting_change(self, context):
     gcode.camera.data.lens = self.cam_lens
     gcode.camera.data.sensor_width = self.sen_width
@@ -177,6 +221,18 @@ def on_setting_change(self, context):
     gcode.set_filament_mat(self.material_selector)
 
     gcode.set_elip_bevel(self.layer_height,self.layer_width)
+    gcode.set_simplify_tolerance(self.simplify_tolerance)
+    gcode.set_geometry_mode(self.geometry_mode)
+    gcode.set_freeze(self.freeze_every, self.freeze_points)
+    gcode.set_single_render(self.single_render)
+    gcode.set_persistent_data(self.persistent_data)
+    gcode.set_telemetry(self.telemetry)
+    gcode.set_async_write(self.async_write)
+    gcode.set_image_format(mask_bits=None if self.mask_bits == 'PROFILE' else int(self.mask_bits))
+    gcode.set_video_stream(None if self.video_stream == 'NONE' else self.video_stream.lower(),
+                           write_images=self.write_images)
+    gcode.set_render_profile(self.render_profile)
+    gcode.set_requested_lps(read_lp_list(self.render_lps) if self.render_lps.strip() else None)
     
     save_path = self.save_path
     if save_path:
@@ -227,17 +283,59 @@ class GCodeReaderPanel(bpy.types.Panel):
             row.prop(my_settings, "layer_width", text="Layer Width")
             row.prop(my_settings, "layer_height", text="Layer Height")
             row = layout.row()
+            row.prop(my_settings, "geometry_mode", text="Geometry")
+            row = layout.row()
+            row.prop(my_settings, "simplify_tolerance", text="Simplify")
+            if gcode.simplify_stats:
+                _, point_count, removed_count = gcode.simplify_stats[-1]
+                row.label(text=f"Removed {removed_count}/{point_count}")
+            row = layout.row()
+            row.prop(my_settings, "freeze_every", text="Freeze Every")
+            row.prop(my_settings, "freeze_points", text="Point Budget")
+            if gcode.frozen_layers > 0:
+                layout.label(text=f"Frozen {gcode.frozen_layers} layers")
+            row = layout.row()
             row.prop(my_settings, "sen_width", text="Sensor")
             row.prop(my_settings, "cam_lens", text="Lens")
             row = layout.row()
             row.prop(my_settings, "light_power", text="Brightness")
             row = layout.row()
+            row.prop(my_settings, "render_profile", text="Profile")
+            row = layout.row()
+            row.prop(my_settings, "render_lps", text="Render Only")
+            if gcode.render_layers is not None:
+                row.label(text=f"{len(gcode.render_layers)} layers")
+            row = layout.row()
             row.prop(my_settings, "enable_render", text="Render?")
             row.prop(my_settings, "hide_collection", text="Hide Collection")
             row = layout.row()
+            row.prop(my_settings, "incremental_render", text="Incremental")
+            row.prop(my_settings, "single_render", text="One Render")
+            row.prop(my_settings, "persistent_data", text="Persistent Data")
+            row = layout.row()
+            row.prop(my_settings, "async_write", text="Async Write")
+            row.prop(my_settings, "mask_bits", text="Mask")
+            row = layout.row()
+            row.prop(my_settings, "video_stream", text="Video")
+            row.prop(my_settings, "write_images", text="Images")
+            if gcode.video_error is not None:
+                layout.label(text=f"{gcode.video_error}, videos are off", icon='ERROR')
+            if gcode.render_timing.last is not None:
+                sync_seconds, sample_seconds = gcode.render_timing.last
+                layout.label(text=f"Last layer: sync {sync_seconds:.2f}s, sample {sample_seconds:.2f}s")
+            row = layout.row()
+            row.prop(my_settings, "telemetry", text="Telemetry")
+            summary = gcode.telemetry.summary(gcode.remaining_layers(my_settings.current_line))
+            if summary is not None:
+                last_seconds, average_seconds, eta_seconds = summary
+                layout.label(text=f"Layer {last_seconds:.1f}s, avg {average_seconds:.1f}s, ETA {eta_seconds / 60:.1f} min")
+            row = layout.row()
             row.prop(my_settings, "current_line", text="Line Number")
             if len(gcode.lines) > 0:
                 layout.label(text=f"Progress: {(my_settings.current_line / len(gcode.lines)) * 100:.1f}%")
+                layers_done, layer_count = gcode.layer_progress(my_settings.current_line)
+                if layer_count > 0:
+                    layout.label(text=f"Layer {layers_done} of {layer_count}")
             
             row = layout.column()
             if not my_settings.rendering:
@@ -247,6 +345,13 @@ class GCodeReaderPanel(bpy.types.Panel):
 
             row.operator("wm.read_gcode_line", text="GCode Line By Line")
 
+            row = layout.row()
+            row.operator("wm.gcode_memory_report", text="Memory Report")
+            if memory_stats is not None:
+                layout.label(text=f"{memory_stats['objects']} objects, {memory_stats['curves']} curves, "
+                                  f"{memory_stats['meshes']} meshes, {memory_stats['collections']} collections")
+                layout.label(text=f"{memory_stats['orphans']} orphans, ~{memory_stats['bytes'] / (1024 * 1024):.1f} MB")
+
             layout.operator("wm.gcode_reset", text="Reset")
         layout.label(text=f"version {bl_info['version'][0]}.{bl_info['version'][1]}.{bl_info['version'][2]}")
 
@@ -264,6 +369,67 @@ class MySettings(PropertyGroup):
         default = False
         )
     
+    incremental_render : BoolProperty(
+        name="Enable or Disable",
+        description="Reuse the latest render of this GCode file and re-render only from the first changed layer",
+        default = False
+        )
+    
+    single_render : BoolProperty(
+        name="Enable or Disable",
+        description="Render sim, bed and mask images as view layers of one render instead of three renders",
+        default = True,
+        update=on_setting_change
+        )
+    
+    persistent_data : BoolProperty(
+        name="Enable or Disable",
+        description="Keep render data between layers so only new layers and moved objects are synced",
+        default = False,
+        update=on_setting_change
+        )
+    
+    async_write : BoolProperty(
+        name="Enable or Disable",
+        description="Encode and write images on background threads while the next pass renders (needs OpenCV)",
+        default = False,
+        update=on_setting_change
+        )
+    
+    mask_bits : EnumProperty(
+        name="Mask",
+        description="Bit depth of masks written from the Viewer node (Async Write or Video)",
+        items=[('PROFILE', "Profile", "Bit depth of the render profile"),
+               ('8', "8-bit", "Single channel grayscale"),
+               ('1', "1-bit", "Thresholded black and white")],
+        default='PROFILE',
+        update=on_setting_change
+    )
+    
+    video_stream : EnumProperty(
+        name="Video",
+        description="Encode sim, bed and mask videos while rendering",
+        items=[('NONE', "None", "Only write images"),
+               ('FFMPEG', "FFmpeg", "H.264 through an ffmpeg pipe"),
+               ('CV2', "OpenCV", "MP4 through cv2.VideoWriter")],
+        default='NONE',
+        update=on_setting_change
+    )
+    
+    write_images : BoolProperty(
+        name="Enable or Disable",
+        description="Write the per-layer images, can be turned off while streaming videos",
+        default = True,
+        update=on_setting_change
+        )
+    
+    telemetry : BoolProperty(
+        name="Enable or Disable",
+        description="Write per-layer stage timings, counts and memory to telemetry.jsonl/.csv in the image folder",
+        default = False,
+        update=on_setting_change
+        )
+    
     rendering : BoolProperty(
         name="Stop Render",
         description="Stop Render",
@@ -304,6 +470,56 @@ class MySettings(PropertyGroup):
         update=on_setting_change
         )
     
+    geometry_mode : EnumProperty(
+        name="Geometry",
+        description="How extrusion paths are turned into geometry",
+        items=[('CURVE', "Curve", "Poly curve beveled with the elliptical bevel object"),
+               ('MESH', "Mesh", "Mesh swept with the elliptical profile in NumPy"),
+               ('NODES', "Geometry Nodes", "Whole print built once and swept by a Geometry Nodes modifier up to the current layer")],
+        default='CURVE',
+        update=on_setting_change
+    )
+    
+    simplify_tolerance : FloatProperty(
+        name = "Set a value",
+        description="Remove toolpath points within this chord tolerance (mm), 0 keeps every point",
+        default=0,
+        min=0,
+        precision=3,
+        update=on_setting_change
+        )
+    
+    freeze_every : IntProperty(
+        name = "Set a value",
+        description="Join finished layers into one static mesh every this many layers, 0 disables",
+        default=0,
+        min=0,
+        update=on_setting_change
+        )
+    
+    freeze_points : IntProperty(
+        name = "Set a value",
+        description="Join finished layers into one static mesh once live layers exceed this many points, 0 disables",
+        default=0,
+        min=0,
+        update=on_setting_change
+        )
+    
+    render_profile : EnumProperty(
+        name="Render Profile",
+        description="Resolution, sampling and output format of the rendered images",
+        items=profile_items(),
+        default=DEFAULT_PROFILE,
+        update=on_setting_change
+    )
+    
+    render_lps : StringProperty(
+        name="Render Only",
+        description="lp values to render: a capture folder with img_*_lp<N> files, a text file, or a comma separated list. Empty renders every layer",
+        default="",
+        update=on_setting_change
+    )
+    
     light_power : IntProperty(
         name = "Set a value",
         description="Setting the brightness of the light",
@@ -341,7 +557,8 @@ classes = (
     ReadGCodeOperator_Line,
     GCodeReset,
     GCodeReaderPanel,
-    StopRender
+    StopRender,
+    MemoryReport
 )
 
 # Register and Unregister Classes
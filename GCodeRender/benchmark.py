@@ -0,0 +1,228 @@
+"""Parser and geometry benchmark over the bundled G-code corpus.
+
+Plain CPython measures the parser only:
+
+    python benchmark.py --output results.json
+
+Inside Blender the geometry build of every layer is timed as well, once per
+geometry mode (curve + bevel object, the NumPy-swept mesh, and the Geometry
+Nodes sweep of the whole print):
+
+    blender -b --factory-startup -P benchmark.py -- --output results.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+plugin_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "PluginScripts")
+if plugin_path not in sys.path:
+    sys.path.append(plugin_path)
+
+from GCodeFile import GCodeFile
+from ScriptSupport import ORIGIN, script_args
+from Toolpath import parse_buffer
+
+try:
+    import bpy
+except ImportError:
+    bpy = None
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def layer_stats(toolpath):
+    """Splines and points create_new_curve writes into each layer's curve."""
+    curves = []
+    points = []
+    for layer in range(toolpath.layer_count + 1):
+        lo, hi = toolpath.layer_range(layer)
+        layer_curves = layer_points = 0
+        for _, path_points in toolpath.iter_paths(lo, hi):
+            layer_curves += 1
+            layer_points += len(path_points)
+        curves.append(layer_curves)
+        points.append(layer_points)
+    return curves, points
+
+
+def bench_parse(path, repeat):
+    gcode_file = GCodeFile(path)
+    lines = len(gcode_file)
+
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        toolpath = parse_buffer(gcode_file, ORIGIN)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    curves, points = layer_stats(toolpath)
+    gcode_file.close()
+
+    return {
+        "file": os.path.basename(path),
+        "lines": lines,
+        "parse_seconds": best,
+        "parse_lines_per_second": lines / best if best else None,
+        "segments": len(toolpath),
+        "extruding_segments": int(toolpath.extrude.sum()),
+        "layers": toolpath.layer_count,
+        "curves_per_layer": curves,
+        "points_per_layer": points,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def _bench_parse_child(args):
+    return bench_parse(*args)
+
+
+def prepare_scene():
+    """Objects GCodeParser expects from the project .blend, created when missing."""
+    if "Essentials" not in bpy.data.collections:
+        essentials = bpy.data.collections.new("Essentials")
+        bpy.context.scene.collection.children.link(essentials)
+    essentials = bpy.data.collections["Essentials"]
+
+    for name in ("Head", "Bed"):
+        if name not in bpy.data.objects:
+            essentials.objects.link(bpy.data.objects.new(name, None))
+
+    for name in ("FilamentMat", "MaskMat"):
+        if name not in bpy.data.materials:
+            bpy.data.materials.new(name)
+
+
+def evaluated_stats():
+    """Time a full depsgraph evaluation, the scene preparation every render starts with."""
+    start = time.perf_counter()
+    depsgraph = bpy.context.evaluated_depsgraph_get()
+    depsgraph.update()
+    seconds = time.perf_counter() - start
+
+    vertices = 0
+    for instance in depsgraph.object_instances:
+        obj = instance.object
+        if obj.name.startswith("Layer_") and obj.type in {'CURVE', 'MESH'}:
+            mesh = obj.to_mesh()
+            vertices += len(mesh.vertices)
+            obj.to_mesh_clear()
+    return seconds, vertices
+
+
+def bench_geometry(path, geometry_mode):
+    from GCodeParser import GCodeParser
+
+    prepare_scene()
+    gcode = GCodeParser(context=bpy.context)
+    gcode.set_context(bpy.context)
+    gcode.set_filament_mat("FilamentMat")
+    gcode.set_geometry_mode(geometry_mode)
+    # A fresh toolpath cache, so every run really parses and no cache lands in the working directory
+    with tempfile.TemporaryDirectory(prefix="toolpath_cache_") as cache_dir:
+        gcode.toolpath_cache.cache_dir = cache_dir
+        gcode.load_file(path)
+    rss_before = peak_rss_mb()
+
+    layer_seconds = []
+    layer_objects = []
+    line_num = 0
+    while True:
+        objects_before = len(bpy.data.objects)
+        start = time.perf_counter()
+        line_num = gcode.parse_gcode(line_num, render=False, hide_new_collection=False)
+        layer_seconds.append(time.perf_counter() - start)
+        layer_objects.append(len(bpy.data.objects) - objects_before)
+        if line_num == 0 or line_num >= len(gcode.lines):
+            break
+
+    evaluate_seconds, evaluated_vertices = evaluated_stats()
+    result = {
+        "geometry_seconds": sum(layer_seconds),
+        "geometry_seconds_per_layer": layer_seconds,
+        "objects_per_layer": layer_objects,
+        "render_prep_seconds": evaluate_seconds,
+        "evaluated_vertices": evaluated_vertices,
+        "peak_rss_mb": peak_rss_mb(),
+        "peak_rss_growth_mb": peak_rss_mb() - rss_before if rss_before is not None else None,
+    }
+    gcode.remove_all()
+    return result
+
+
+def run_metadata():
+    metadata = {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "blender": bpy.app.version_string if bpy is not None else None,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    try:
+        metadata["commit"] = subprocess.run(["git", "rev-parse", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                            capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        metadata["commit"] = None
+    return metadata
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark GCode parsing and geometry building")
+    parser.add_argument("folder", nargs="?", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "GCodes"))
+    parser.add_argument("--output", default="benchmark.json", help="JSON file the results are written to")
+    parser.add_argument("--repeat", type=int, default=3, help="parse repetitions, the best time is kept")
+    parser.add_argument("--no-geometry", action="store_true", help="skip the bpy geometry build")
+    parser.add_argument("--geometry-mode", nargs="+", default=["CURVE", "MESH"], choices=["CURVE", "MESH", "NODES"],
+                        help="GCodeParser geometry modes to build and compare")
+    args = parser.parse_args(script_args())
+
+    files = [os.path.join(args.folder, name) for name in sorted(os.listdir(args.folder))
+             if name.lower().endswith(".gcode")]
+
+    if bpy is None:
+        # A fresh process per file keeps the peak RSS figures independent
+        with multiprocessing.get_context("spawn").Pool(1, maxtasksperchild=1) as pool:
+            results = pool.map(_bench_parse_child, [(path, args.repeat) for path in files], chunksize=1)
+    else:
+        results = [bench_parse(path, args.repeat) for path in files]
+
+    for path, result in zip(files, results):
+        if bpy is not None and not args.no_geometry:
+            result["geometry"] = {mode: bench_geometry(path, mode) for mode in args.geometry_mode}
+
+        line = (f"{result['file']:<22}{result['lines']:>8} lines {result['parse_lines_per_second']:>12,.0f} lines/s "
+                f"{result['segments']:>8} segments {sum(result['curves_per_layer']):>6} curves "
+                f"{sum(result['points_per_layer']):>8} points")
+        print(line)
+        for mode, geometry in result.get("geometry", {}).items():
+            print(f"    {mode:<6} build {geometry['geometry_seconds']:>8.2f}s  render prep {geometry['render_prep_seconds']:>7.2f}s  "
+                  f"{geometry['evaluated_vertices']:>9} vertices  peak RSS {geometry['peak_rss_mb'] or 0:>8.1f} MB")
+
+    with open(args.output, "w") as f:
+        json.dump({"metadata": run_metadata(), "results": results}, f, indent=2)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+plugin_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "PluginScripts")
+if plugin_path not in sys.path:
+    sys.path.append(plugin_path)
+
+from GCodeFile import GCodeFile
+from ScriptSupport import ORIGIN, script_args
+from Toolpath import LAYER_COLUMNS, SEGMENT_COLUMNS, parse_buffer, parse_toolpath
+
+
+def best_time(func, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def baseline_parse(lines, origin):
+    """Paths and marker states of ``lines`` (``str``) by the rules of the original ``parse_gcode``.
+
+    A copy of its classification without Blender, kept independent of both
+    engines: prefix matched commands, whitespace split words up to a lone
+    ``;``, a move extrudes when its E is above ``last_e``, a lower E, a move
+    without E, ``G92 E0`` and every M118 close the current path. Returns the
+    paths of every layer (float32 point arrays) and ``(head, last_e)`` at
+    every marker.
+    """
+    head = [float(v) for v in origin]
+    last_e = 0.0
+    layers = [[]]
+    markers = []
+    current = []
+
+    def close_loop():
+        if len(current) > 1:
+            layers[-1].append(np.array(current, dtype=np.float32))
+        current.clear()
+
+    for line in lines:
+        is_g0 = line.startswith('G0')
+        is_g1 = line.startswith('G1')
+        is_g92 = line.startswith('G92')
+        if line.startswith('M118'):
+            close_loop()
+            markers.append((tuple(head), last_e))
+            layers.append([])
+            continue
+        if not (is_g0 or is_g1 or is_g92):
+            continue
+
+        x = y = z = e = None
+        for param in line.split():
+            if param.startswith('X'):
+                x = float(param[1:])
+            if param.startswith('Y'):
+                y = float(param[1:])
+            if param.startswith('Z'):
+                z = float(param[1:])
+            if param.startswith('E'):
+                e = float(param[1:])
+            if param == ';':
+                break
+
+        if is_g92:
+            if e == 0:
+                last_e = 0.0
+                close_loop()
+            continue
+
+        new_head = [head[0] if x is None else x, head[1] if y is None else y, head[2] if z is None else z]
+        if e is not None and e - last_e > 0:
+            last_e = e
+            if not current:
+                current.append(tuple(head))
+            current.append(tuple(new_head))
+        elif e is None or e - last_e < 0:
+            close_loop()
+        head = new_head
+
+    close_loop()
+    return layers, markers
+
+
+def compare_baseline(baseline, toolpath):
+    """Differences between ``baseline_parse`` output and a :class:`Toolpath`."""
+    layers, markers = baseline
+    mismatches = []
+    if len(markers) != toolpath.layer_count:
+        return [f"{toolpath.layer_count} layers instead of {len(markers)}"]
+    if not np.array_equal(np.array([head for head, _ in markers], dtype=np.float64).reshape(-1, 3),
+                          toolpath.layers.head):
+        mismatches.append("marker head")
+    if not np.array_equal(np.array([e for _, e in markers], dtype=np.float64), toolpath.layers.e):
+        mismatches.append("marker E")
+
+    for layer, paths in enumerate(layers):
+        parsed = [points for _, points in toolpath.iter_paths(*toolpath.layer_range(layer))]
+        if len(parsed) != len(paths) or not all(np.array_equal(a, b) for a, b in zip(paths, parsed)):
+            mismatches.append(f"paths of layer {layer}")
+            break
+    return mismatches
+
+
+def compare(reference, bulk):
+    mismatches = [name for name in SEGMENT_COLUMNS
+                  if not np.array_equal(getattr(reference, name), getattr(bulk, name))]
+    mismatches += [f"layers.{name}" for name in LAYER_COLUMNS
+                   if not np.array_equal(getattr(reference.layers, name), getattr(bulk.layers, name))]
+    if reference.layers.name != bulk.layers.name:
+        mismatches.append("layers.name")
+    return mismatches
+
+
+def relative_paths(path):
+    """Path ids counted from the first path of the range, travel stays -1."""
+    path = path.copy()
+    extruding = path >= 0
+    if extruding.any():
+        path[extruding] -= path[extruding].min()
+    return path
+
+
+def check_resume(gcode_file, reference):
+    """Layers whose moves differ when parsed alone from ``LayerIndex.state`` instead of from the file start.
+
+    Both engines are resumed at every marker. Path ids restart at 0 on a
+    resume, so they are compared relative to the first path of the layer.
+    """
+    layers = reference.layers
+    failed = []
+    for layer in range(1, len(layers) + 1):
+        start_line = layers.layer_start(layer)
+        stop_line = layers.layer_start(layer + 1) if layer < len(layers) else len(gcode_file)
+        lo, hi = reference.layer_range(layer)
+        parts = (
+            parse_toolpath(gcode_file.iter_lines(start_line, stop_line), state=layers.state(layer, ORIGIN),
+                           first_line=start_line),
+            parse_buffer(gcode_file, ORIGIN, start_line, stop_line, state=layers.state(layer, ORIGIN)),
+        )
+        for part in parts:
+            same = len(part) == hi - lo and all(
+                np.array_equal(getattr(part, name), getattr(reference, name)[lo:hi])
+                for name in ("start", "end", "extrude", "layer", "line"))
+            if not same or not np.array_equal(relative_paths(part.path), relative_paths(reference.path[lo:hi])):
+                failed.append(layer)
+                break
+    return failed
+
+
+def check_file(path, repeat, resume=False):
+    gcode_file = GCodeFile(path)
+
+    reference, line_time = best_time(lambda: parse_toolpath(gcode_file.iter_lines(), ORIGIN), repeat)
+    bulk, bulk_time = best_time(lambda: parse_buffer(gcode_file, ORIGIN), repeat)
+
+    # Both engines against the original rules, then against each other column by column
+    with open(path, 'r') as f:
+        baseline = baseline_parse(f.readlines(), ORIGIN)
+    mismatches = [f"line by line: {m}" for m in compare_baseline(baseline, reference)]
+    mismatches += [f"bulk: {m}" for m in compare_baseline(baseline, bulk)]
+    mismatches += compare(reference, bulk)
+    resume_failed = check_resume(gcode_file, reference) if resume else []
+    lines = len(gcode_file)
+    gcode_file.close()
+
+    return {
+        "file": os.path.basename(path),
+        "lines": lines,
+        "segments": len(bulk),
+        "layers": bulk.layer_count,
+        "match": not mismatches and not resume_failed,
+        "mismatches": mismatches,
+        "resume_failed": resume_failed,
+        "line_by_line_lps": lines / line_time,
+        "bulk_lps": lines / bulk_time,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check both toolpath parsers against the original parse_gcode rules and each other")
+    parser.add_argument("folder", nargs="?", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "GCodes"))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--resume", action="store_true",
+                        help="also resume both parsers at every layer marker and compare with the full parse")
+    args = parser.parse_args(script_args())
+
+    ok = True
+    print(f"{'file':<22}{'lines':>8}{'segments':>10}{'layers':>8}  match{'line/s':>14}{'bulk/s':>14}{'speedup':>9}")
+    for name in sorted(os.listdir(args.folder)):
+        if not name.lower().endswith(".gcode"):
+            continue
+
+        result = check_file(os.path.join(args.folder, name), args.repeat, args.resume)
+        ok &= result["match"]
+        speedup = result["bulk_lps"] / result["line_by_line_lps"]
+        print(f"{result['file']:<22}{result['lines']:>8}{result['segments']:>10}{result['layers']:>8}  "
+              f"{'yes' if result['match'] else 'NO':<5}{result['line_by_line_lps']:>14,.0f}"
+              f"{result['bulk_lps']:>14,.0f}{speedup:>8.1f}x")
+        if result["mismatches"]:
+            print(f"    differences: {', '.join(result['mismatches'])}")
+        if result["resume_failed"]:
+            failed = result["resume_failed"]
+            print(f"    {len(failed)} layers differ when resumed, first {failed[:10]}")
+
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
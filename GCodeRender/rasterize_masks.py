@@ -0,0 +1,115 @@
+"""Rasterize the ``msk_Z_lp*`` masks of a G-code file on the CPU, without Blender.
+
+    python rasterize_masks.py GCodes/cube.gcode --output masks
+
+With ``--compare`` the masks are checked against a folder Blender rendered
+(``images_<timestamp>``) and the IoU of every layer is reported:
+
+    python rasterize_masks.py GCodes/cube.gcode --compare images_20241227-120000 --report iou.json
+
+``--check 10`` redraws every 10th layer (and the last) from the toolpath
+without the per-layer cache and reports the IoU against the cached mask.
+
+The masks have not been validated against Blender renders yet; run
+``--compare`` on a rendered folder before using them in place of the
+``msk`` pass.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+plugin_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "PluginScripts")
+if plugin_path not in sys.path:
+    sys.path.append(plugin_path)
+
+from CameraCalibration import CameraCalibration
+from GCodeFile import GCodeFile
+from MaskRasterizer import MaskRasterizer, mask_iou
+from ScriptSupport import ORIGIN, script_args
+from Toolpath import parse_buffer
+
+CALIBRATION = os.path.join(os.path.dirname(os.path.abspath(__file__)), "CameraIntAruco_ExtAsym.mat")
+
+
+def rasterize(path, camera, layer_height, layer_width, output=None, compare=None, check_every=0):
+    gcode_file = GCodeFile(path)
+    toolpath = parse_buffer(gcode_file, ORIGIN)
+    gcode_file.close()
+    layers = toolpath.layers
+
+    rasterizer = MaskRasterizer(toolpath, camera, layer_height=layer_height, layer_width=layer_width)
+    if output:
+        os.makedirs(output, exist_ok=True)
+
+    results = []
+    for marker in range(len(layers)):
+        name = layers.name[marker]
+        start = time.perf_counter()
+        # The camera rides up with the head, see GCodeParser.move_platform_up
+        camera_offset = (0, 0, layers.head[marker][2])
+        mask = rasterizer.draw_layer(marker, camera_offset=camera_offset)
+        result = {"layer": marker, "name": name, "seconds": time.perf_counter() - start}
+
+        if check_every and (marker % check_every == 0 or marker == len(layers) - 1):
+            result["check_iou"] = mask_iou(mask, rasterizer.draw_reference(marker, camera_offset))
+
+        if output:
+            cv2.imwrite(os.path.join(output, f"msk_Z_lp{name}.png"), mask)
+
+        if compare:
+            reference = cv2.imread(os.path.join(compare, f"msk_Z_lp{name}.png"), cv2.IMREAD_GRAYSCALE)
+            if reference is not None:
+                result["iou"] = mask_iou(mask, reference)
+
+        results.append(result)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rasterize layer masks from the toolpath and camera calibration")
+    parser.add_argument("gcode", help="G-code file")
+    parser.add_argument("--calibration", default=CALIBRATION, help="MATLAB camera parameters and extrinsics")
+    parser.add_argument("--layer-height", type=float, default=0.2)
+    parser.add_argument("--layer-width", type=float, default=0.4)
+    parser.add_argument("--output", help="folder the msk_Z_lp*.png masks are written to")
+    parser.add_argument("--compare", help="folder with Blender's msk_Z_lp*.png masks to compute the IoU against")
+    parser.add_argument("--check", type=int, default=0, metavar="N",
+                        help="compare every Nth cached mask with one drawn from scratch")
+    parser.add_argument("--report", help="JSON file the per-layer timings and IoU are written to")
+    args = parser.parse_args(script_args())
+
+    camera = CameraCalibration.from_mat(args.calibration)
+    results = rasterize(args.gcode, camera, args.layer_height, args.layer_width, args.output, args.compare,
+                        args.check)
+
+    seconds = [result["seconds"] for result in results]
+    print(f"{os.path.basename(args.gcode)}: {len(results)} layers, {sum(seconds):.2f}s, "
+          f"{1000 * np.mean(seconds) if seconds else 0:.1f} ms/layer")
+
+    ious = [result["iou"] for result in results if "iou" in result]
+    if ious:
+        worst = min(results, key=lambda result: result.get("iou", 1.0))
+        print(f"IoU over {len(ious)} layers: mean {np.mean(ious):.4f}, min {worst['iou']:.4f} (lp{worst['name']})")
+    elif args.compare:
+        print(f"No msk_Z_lp*.png masks found in {args.compare}")
+
+    checks = [result for result in results if "check_iou" in result]
+    if checks:
+        worst = min(checks, key=lambda result: result["check_iou"])
+        print(f"Cache check over {len(checks)} layers: min IoU {worst['check_iou']:.4f} (lp{worst['name']})")
+
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump({"gcode": args.gcode, "calibration": args.calibration, "layers": results}, f, indent=2)
+        print(f"Report written to {args.report}")
+
+    return 1 if checks and min(result["check_iou"] for result in checks) < 0.999 else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,147 @@
+"""Render a G-code file, or a range of its layers, from the command line.
+
+Run inside Blender with the project .blend (it provides the Essentials
+collection, Head, Bed and the materials):
+
+    blender -b GCodeRender.blend -P render_gcode.py -- GCodes/cube.gcode --save-path renders
+
+Layers before ``--first-layer`` are built in one go without rendering, so a
+worker of ``render_pool.py`` starts rendering its shard right away.
+
+``--video ffmpeg`` encodes the sim, bed and mask videos while rendering,
+into ``videos/`` beside the image folder; add ``--no-images`` to skip the
+per-layer images.
+"""
+import argparse
+import os
+import sys
+import time
+
+import bpy
+
+plugin_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "PluginScripts")
+if plugin_path not in sys.path:
+    sys.path.append(plugin_path)
+
+from GCodeParser import GCodeParser
+from ImageWriter import IMAGE_FORMATS
+from VideoStream import VIDEO_ENCODERS
+from LayerSelection import read_lp_list
+from RenderProfiles import DEFAULT_PROFILE, RENDER_PROFILES
+from ScriptSupport import script_args
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Render G-code layers in a background Blender")
+    parser.add_argument("gcode", help="G-code file")
+    parser.add_argument("--save-path", default=os.getcwd(), help="folder the images_<timestamp> folder is created in")
+    parser.add_argument("--output-dir", help="exact image folder, shared by the workers of one render_pool run")
+    parser.add_argument("--first-layer", type=int, default=0, help="first M118 layer to render")
+    parser.add_argument("--last-layer", type=int, help="last M118 layer to render (inclusive), default the last one")
+    parser.add_argument("--layer-height", type=float, default=0.2)
+    parser.add_argument("--layer-width", type=float, default=0.4)
+    parser.add_argument("--material", default="FilamentMat", help="filament material of the .blend")
+    parser.add_argument("--geometry-mode", default="CURVE", choices=["CURVE", "MESH", "NODES"])
+    parser.add_argument("--simplify", type=float, default=0, help="toolpath simplification tolerance (mm)")
+    parser.add_argument("--lp", help="render only these lp values: a capture folder (img_*_lp<N>.jpg), "
+                                     "a text file or a comma separated list")
+    parser.add_argument("--profile", default=DEFAULT_PROFILE, choices=sorted(RENDER_PROFILES),
+                        help="render profile: resolution, sampling and output format")
+    parser.add_argument("--persistent-data", action="store_true",
+                        help="keep render data between layers, only new layers and moved objects are synced")
+    parser.add_argument("--async-write", action="store_true",
+                        help="encode and write images on background threads while the next pass renders (needs OpenCV)")
+    parser.add_argument("--write-workers", type=int, default=2, help="image writer threads of --async-write")
+    parser.add_argument("--image-format", choices=IMAGE_FORMATS, help="output format instead of the profile's")
+    parser.add_argument("--compression", type=int, help="PNG compression in percent (0-100)")
+    parser.add_argument("--quality", type=int, help="JPEG/WebP quality, WebP at 100 is lossless")
+    parser.add_argument("--mask-bits", type=int, choices=[1, 8], help="bit depth of masks written with --async-write or --video")
+    parser.add_argument("--video", choices=VIDEO_ENCODERS, help="encode sim/bed/msk videos while rendering")
+    parser.add_argument("--fps", type=int, default=30, help="frame rate of --video")
+    parser.add_argument("--no-images", action="store_true", help="with --video, skip the per-layer images")
+    parser.add_argument("--telemetry", action="store_true",
+                        help="write per-layer timings, counts and memory to telemetry.jsonl/.csv in the image folder")
+    parser.add_argument("--separate-renders", action="store_true", help="render sim, bed and mask one by one")
+    return parser.parse_args(argv)
+
+
+def create_parser(args):
+    context = bpy.context
+    gcode = GCodeParser(context=context, save_path=args.save_path,
+                        layer_height=args.layer_height, layer_width=args.layer_width)
+    gcode.set_context(context)
+    gcode.set_filament_mat(args.material)
+    gcode.set_geometry_mode(args.geometry_mode)
+    gcode.set_simplify_tolerance(args.simplify)
+    gcode.set_single_render(not args.separate_renders)
+    gcode.set_render_profile(args.profile)
+    gcode.set_persistent_data(args.persistent_data)
+    gcode.set_async_write(args.async_write, args.write_workers)
+    # Workers of render_pool share the image folder, each streams its own part of the videos
+    sharded = args.first_layer > 0 or args.last_layer is not None
+    suffix = f"_layers{args.first_layer}-{args.last_layer if args.last_layer is not None else 'end'}" if sharded else ""
+    gcode.set_video_stream(args.video, args.fps, not args.no_images, suffix)
+    if gcode.video_error is not None:
+        raise SystemExit(f"--video {args.video}: {gcode.video_error}")
+    gcode.set_telemetry(args.telemetry, f"telemetry{suffix}")
+    gcode.set_image_format(file_format=args.image_format, compression=args.compression,
+                           quality=args.quality, mask_bits=args.mask_bits)
+    if args.output_dir:
+        gcode.dir_path = os.path.abspath(args.output_dir)
+    gcode.load_file(args.gcode)
+    if args.lp:
+        gcode.set_requested_lps(read_lp_list(args.lp))
+        if not gcode.render_layers:
+            raise SystemExit(f"--lp {args.lp} selects none of the {len(gcode.layer_index)} layers")
+    return gcode
+
+
+def render_layers(gcode, first_layer, last_layer):
+    layer_count = len(gcode.layer_index)
+    if last_layer is None or last_layer >= layer_count:
+        last_layer = layer_count - 1
+
+    start = time.perf_counter()
+    line_num = gcode.build_to_layer(first_layer)
+    print(f"Built layers 0-{first_layer - 1} in {time.perf_counter() - start:.2f}s")
+
+    rendered = 0
+    while True:
+        layer_start = time.perf_counter()
+        # Without an lp list this is a no-op, with one the layers in between are built in bulk
+        line_num = gcode.skip_unrendered(line_num)
+        marker = gcode.layer_index.next_marker(line_num)
+        if marker > last_layer:
+            break
+
+        line_num = gcode.parse_gcode(line_num, render=True, hide_new_collection=False)
+        rendered += 1
+        print(f"Layer {marker} ({gcode.layer_index.name[marker]}) rendered in {time.perf_counter() - layer_start:.2f}s")
+        if line_num == 0 or line_num >= len(gcode.lines):
+            break
+
+    return rendered
+
+
+def main():
+    args = parse_args(script_args())
+    gcode = create_parser(args)
+
+    start = time.perf_counter()
+    rendered = render_layers(gcode, args.first_layer, args.last_layer)
+    gcode.flush_writes()
+    gcode.finish_videos()
+    print(f"Rendered {rendered} layers into {gcode.dir_path} in {time.perf_counter() - start:.2f}s")
+
+    history = gcode.render_timing.history
+    if history:
+        # Sync time should stay flat with persistent data instead of growing with the print height
+        half = max(1, len(history) // 2)
+        first, second = history[:half], history[half:] or history[:half]
+        for label, timings in (("first half", first), ("second half", second)):
+            print(f"  {label}: sync {sum(t[0] for t in timings) / len(timings):.2f}s, "
+                  f"sample {sum(t[1] for t in timings) / len(timings):.2f}s per layer")
+
+
+if __name__ == "__main__":
+    main()
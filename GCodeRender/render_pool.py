@@ -0,0 +1,95 @@
+"""Render one G-code file with several background Blender processes.
+
+The layer range is split into contiguous shards, one per worker, and every
+worker runs ``render_gcode.py`` on its shard into the same image folder:
+
+    python render_pool.py GCodes/cube.gcode --blend GCodeRender.blend --workers 4
+
+Arguments after ``--`` are passed on to ``render_gcode.py``.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+plugin_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "PluginScripts")
+if plugin_path not in sys.path:
+    sys.path.append(plugin_path)
+
+from GCodeFile import GCodeFile
+from Toolpath import parse_buffer
+
+RENDER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "render_gcode.py")
+
+
+def layer_count(path):
+    gcode_file = GCodeFile(path)
+    count = parse_buffer(gcode_file).layer_count
+    gcode_file.close()
+    return count
+
+
+def shards(first_layer, last_layer, workers):
+    """Contiguous ``(first, last)`` layer ranges of nearly equal size."""
+    count = last_layer - first_layer + 1
+    workers = max(1, min(workers, count))
+    bounds = [first_layer + count * i // workers for i in range(workers + 1)]
+    return [(bounds[i], bounds[i + 1] - 1) for i in range(workers)]
+
+
+def main():
+    argv = sys.argv[1:]
+    passthrough = []
+    if "--" in argv:
+        passthrough = argv[argv.index("--") + 1:]
+        argv = argv[:argv.index("--")]
+
+    parser = argparse.ArgumentParser(description="Shard the layers of a G-code render across background Blender processes")
+    parser.add_argument("gcode", help="G-code file")
+    parser.add_argument("--blend", required=True, help="project .blend with the Essentials collection and materials")
+    parser.add_argument("--blender", default="blender", help="Blender executable")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 1) // 4))
+    parser.add_argument("--threads", type=int, help="render threads per worker, default the cores divided by the workers")
+    parser.add_argument("--save-path", default=os.getcwd(), help="folder the images_<timestamp> folder is created in")
+    parser.add_argument("--first-layer", type=int, default=0)
+    parser.add_argument("--last-layer", type=int)
+    args = parser.parse_args(argv)
+
+    count = layer_count(args.gcode)
+    last_layer = count - 1 if args.last_layer is None else min(args.last_layer, count - 1)
+    if last_layer < args.first_layer:
+        print(f"No layers to render in {args.gcode} ({count} layers)")
+        return 1
+
+    output_dir = os.path.join(os.path.abspath(args.save_path), f"images_{time.strftime('%Y%m%d-%H%M%S')}")
+    os.makedirs(output_dir, exist_ok=True)
+    threads = args.threads or max(1, (os.cpu_count() or 1) // args.workers)
+
+    workers = []
+    for index, (first, last) in enumerate(shards(args.first_layer, last_layer, args.workers)):
+        # Without --python-exit-code Blender exits 0 even when the script raises
+        command = [args.blender, "-b", args.blend, "-t", str(threads), "--python-exit-code", "1",
+                   "-P", RENDER_SCRIPT, "--",
+                   os.path.abspath(args.gcode), "--output-dir", output_dir,
+                   "--first-layer", str(first), "--last-layer", str(last), *passthrough]
+        log = open(os.path.join(output_dir, f"render_worker_{index}.log"), "w")
+        print(f"Worker {index}: layers {first}-{last}")
+        workers.append((index, subprocess.Popen(command, stdout=log, stderr=subprocess.STDOUT), log))
+
+    start = time.perf_counter()
+    failed = 0
+    for index, process, log in workers:
+        code = process.wait()
+        log.close()
+        if code != 0:
+            failed += 1
+            print(f"Worker {index} failed with exit code {code}, see {log.name}")
+
+    print(f"Rendered layers {args.first_layer}-{last_layer} with {len(workers)} workers "
+          f"into {output_dir} in {time.perf_counter() - start:.1f}s")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,23 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# The PluginScripts modules import each other by name, the scripts beside them (check_tokenizer) by theirs
+for path in (os.path.join(ROOT, "PluginScripts"), ROOT):
+    if path not in sys.path:
+        sys.path.append(path)
+
+GCODES = os.path.join(ROOT, "GCodes")
+GCODE_FILES = sorted(name for name in os.listdir(GCODES) if name.lower().endswith(".gcode"))
+
+
+@pytest.fixture
+def gcodes_dir():
+    return GCODES
+
+
+@pytest.fixture(params=GCODE_FILES)
+def gcode_path(request):
+    return os.path.join(GCODES, request.param)
@@ -0,0 +1,32 @@
+from LayerSelection import lp_from_name, read_lp_list, select_layers
+
+
+NAMES = ["0.000000", "0.193798", "0.500000", "1.000000"]
+
+
+def test_select_by_name():
+    assert select_layers(NAMES, ["0.193798", "1.000000"]) == [1, 3]
+
+
+def test_select_numerically():
+    assert select_layers(NAMES, ["0.5", "1"]) == [2, 3]
+
+
+def test_select_nothing():
+    assert select_layers(NAMES, ["7", "abc"]) == []
+
+
+def test_read_lp_list(tmp_path):
+    assert read_lp_list("0.5, 1;2 3") == ["0.5", "1", "2", "3"]
+
+    (tmp_path / "img_3_lp0.193798.jpg").write_bytes(b"")
+    (tmp_path / "img_4_lp0.5.png").write_bytes(b"")
+    (tmp_path / "notes.txt").write_text("0.7\n")
+    assert read_lp_list(str(tmp_path)) == ["0.193798", "0.5"]
+    assert read_lp_list(str(tmp_path / "notes.txt")) == ["0.7"]
+
+
+def test_lp_from_name():
+    assert lp_from_name("img_3_lp0.193798.jpg") == "0.193798"
+    assert lp_from_name("msk_Z_lp0.25.png") == "0.25"
+    assert lp_from_name("image.png") is None
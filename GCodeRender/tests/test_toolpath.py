@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from check_tokenizer import baseline_parse, check_resume, compare, compare_baseline
+from GCodeFile import GCodeFile
+from ScriptSupport import ORIGIN
+from Toolpath import parse_buffer, parse_toolpath, simplify_points
+
+
+@pytest.fixture
+def gcode_file(gcode_path):
+    gcode_file = GCodeFile(gcode_path)
+    yield gcode_file
+    gcode_file.close()
+
+
+def test_engines_match(gcode_file):
+    assert compare(parse_toolpath(gcode_file.iter_lines(), ORIGIN), parse_buffer(gcode_file, ORIGIN)) == []
+
+
+def test_engines_follow_original_rules(gcode_file, gcode_path):
+    with open(gcode_path) as f:
+        baseline = baseline_parse(f.readlines(), ORIGIN)
+    assert compare_baseline(baseline, parse_toolpath(gcode_file.iter_lines(), ORIGIN)) == []
+    assert compare_baseline(baseline, parse_buffer(gcode_file, ORIGIN)) == []
+
+
+def test_resume_from_every_marker(gcode_file):
+    assert check_resume(gcode_file, parse_buffer(gcode_file, ORIGIN)) == []
+
+
+def test_resume_keeps_exact_e():
+    lines = [b"G1 X1 Y0 E22.52718", b"M118 e_pos:1,0", b"G1 X2 Y0 E22.52718", b"G1 X3 Y0 E22.6"]
+    full = parse_toolpath(lines)
+    layers = full.layers
+    resumed = parse_toolpath(lines[2:], state=layers.state(1), first_line=layers.layer_start(1))
+
+    assert layers.e[0] == 22.52718
+    assert resumed.extrude.tolist() == [False, True]
+    assert np.array_equal(resumed.extrude, full.extrude[1:])
+
+
+def test_simplify_keeps_every_point_at_zero_tolerance():
+    points = np.array([[0, 0, 0], [1, 0, 0], [2, 0, 0], [3, 0.001, 0]], dtype=np.float32)
+    assert simplify_points(points, 0).all()
+    assert simplify_points(points, 0.01).tolist() == [True, False, False, True]
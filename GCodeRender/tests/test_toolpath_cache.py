@@ -0,0 +1,42 @@
+import os
+
+import numpy as np
+import pytest
+
+from GCodeFile import GCodeFile
+from Toolpath import SEGMENT_COLUMNS, parse_buffer
+from ToolpathCache import ToolpathCache
+
+
+@pytest.fixture
+def toolpath(gcodes_dir):
+    gcode_file = GCodeFile(os.path.join(gcodes_dir, "pyramid.gcode"))
+    yield parse_buffer(gcode_file)
+    gcode_file.close()
+
+
+def test_round_trip(tmp_path, toolpath):
+    cache = ToolpathCache(str(tmp_path))
+    cache.store("key", toolpath)
+    loaded = cache.load("key")
+
+    for name in SEGMENT_COLUMNS:
+        assert np.array_equal(getattr(loaded, name), getattr(toolpath, name))
+    assert loaded.layers.name == toolpath.layers.name
+    assert np.array_equal(loaded.layers.e, toolpath.layers.e)
+    assert os.listdir(tmp_path) == ["toolpath_key.npz"]
+
+
+@pytest.mark.parametrize("damage", ["truncated", "empty", "garbage"])
+def test_corrupt_entry_is_dropped(tmp_path, toolpath, damage):
+    cache = ToolpathCache(str(tmp_path))
+    cache.store("key", toolpath)
+    path = tmp_path / "toolpath_key.npz"
+    data = path.read_bytes()
+    path.write_bytes({"truncated": data[:len(data) // 2], "empty": b"", "garbage": b"not a zip file"}[damage])
+
+    assert cache.load("key") is None
+    assert not path.exists()
+
+    cache.store("key", toolpath)
+    assert len(cache.load("key")) == len(toolpath)
@@ -1,36 +1,154 @@
-import cv2
+"""Build one video per render pass from an image folder.
+
+    python video_creator.py images_20241104-230453
+    python video_creator.py images_20241104-230453 --prefixes sim msk --fps 30
+
+The folder is scanned once and its images grouped by prefix (``sim``,
+``bed``, ``msk`` of the renderer and ``score_map_``, ``result_mask_``,
+``final_`` of the defect API). All videos are encoded at the same time,
+each writer fed by decodes running ahead of it on a shared thread pool,
+so the total time approaches that of the longest video.
+"""
+import argparse
+import collections
 import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
 from natsort import natsorted
 
-def create_video(image_folder,prefix):
+plugin_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "PluginScripts")
+if plugin_path not in sys.path:
+    sys.path.append(plugin_path)
+
+# The formats the renderer can write, so the two lists can't drift apart
+from RenderRecord import IMAGE_EXTENSIONS
+
+
+PREFIXES = ("sim", "bed", "msk", "score_map_", "result_mask_", "final_")
+
+
+def group_images(image_folder, prefixes=PREFIXES):
+    """Naturally sorted image file names of ``image_folder`` by prefix, from a single directory scan.
+
+    A name goes to the longest prefix it starts with.
+    """
+    by_length = sorted(prefixes, key=len, reverse=True)
+    groups = {prefix: [] for prefix in prefixes}
+    with os.scandir(image_folder) as entries:
+        for entry in entries:
+            if not entry.name.endswith(IMAGE_EXTENSIONS) or not entry.is_file():
+                continue
+            for prefix in by_length:
+                if entry.name.startswith(prefix):
+                    groups[prefix].append(entry.name)
+                    break
+
+    return {prefix: natsorted(names) for prefix, names in groups.items() if names}
+
+
+def read_frame(path):
+    frame = cv2.imread(path)
+    if frame is None:
+        raise OSError(f"Could not read {path}")
+    return frame
+
+
+def prefetch_frames(paths, decoder, depth):
+    """Decoded frames of ``paths`` in order, with up to ``depth`` decodes running ahead on ``decoder``."""
+    pending = collections.deque()
+    paths = iter(paths)
+    for path in paths:
+        pending.append(decoder.submit(read_frame, path))
+        if len(pending) >= depth:
+            break
+
+    while pending:
+        frame = pending.popleft().result()
+        next_path = next(paths, None)
+        if next_path is not None:
+            pending.append(decoder.submit(read_frame, next_path))
+        yield frame
+
+
+def video_name(image_folder, prefix):
+    return f"video_{prefix.rstrip('_')}_{os.path.basename(os.path.normpath(image_folder))}.mp4"
+
+
+def create_video(image_folder, prefix, images=None, output_dir="./videos", fps=30, decoder=None, prefetch=8):
+    """Encode the ``prefix`` images of ``image_folder`` into ``output_dir`` and return the video path.
+
+    ``images`` skips the directory scan, ``decoder`` is a thread pool shared
+    with other videos.
+    """
+    if images is None:
+        images = group_images(image_folder, (prefix,)).get(prefix, [])
+    if not images:
+        raise FileNotFoundError(f"No {prefix} images in {image_folder}")
+
+    os.makedirs(output_dir, exist_ok=True)
+    output_video = os.path.join(output_dir, video_name(image_folder, prefix))
+
+    own_decoder = decoder is None
+    if own_decoder:
+        decoder = ThreadPoolExecutor(max_workers=2)
+
+    video = None
+    try:
+        paths = [os.path.join(image_folder, image) for image in images]
+        for frame in prefetch_frames(paths, decoder, prefetch):
+            if video is None:
+                height, width = frame.shape[:2]
+                fourcc = cv2.VideoWriter_fourcc(*'mp4v')  # For MP4 format
+                video = cv2.VideoWriter(output_video, fourcc, fps, (width, height))
+            video.write(frame)
+    finally:
+        if video is not None:
+            video.release()
+        if own_decoder:
+            decoder.shutdown(wait=True)
+
+    return output_video
+
 
-    if not os.path.exists("./videos"):
-        os.mkdir("./videos")
-    
-    output_video = f'./videos/video_{prefix}_{image_folder}.mp4' 
+def create_videos(image_folder, prefixes=PREFIXES, output_dir="./videos", fps=30, decode_workers=None, prefetch=8):
+    """Encode a video per prefix found in ``image_folder`` concurrently, ``{prefix: video path}``."""
+    groups = group_images(image_folder, prefixes)
+    if not groups:
+        return {}
 
-    images = [img for img in os.listdir(image_folder) if img.endswith(('.png', '.jpg', '.jpeg')) and img.startswith(prefix)]
-    images = natsorted(images)  # Sort images in natural order
+    decode_workers = decode_workers or min(32, (os.cpu_count() or 1) + 4)
+    with ThreadPoolExecutor(max_workers=decode_workers, thread_name_prefix="decode") as decoder, \
+            ThreadPoolExecutor(max_workers=len(groups), thread_name_prefix="encode") as encoders:
+        futures = {prefix: encoders.submit(create_video, image_folder, prefix, images, output_dir, fps, decoder, prefetch)
+                   for prefix, images in groups.items()}
+        return {prefix: future.result() for prefix, future in futures.items()}
 
-    frame = cv2.imread(os.path.join(image_folder, images[0]))
-    height, width, layers = frame.shape
-    frame_size = (width, height)
 
-    fourcc = cv2.VideoWriter_fourcc(*'mp4v')  # For MP4 format
-    video = cv2.VideoWriter(output_video, fourcc, 30, frame_size)  # 30 is the frame rate
+def main():
+    parser = argparse.ArgumentParser(description="Build a video per render pass from an image folder")
+    parser.add_argument("image_folder", help="images_<timestamp> folder")
+    parser.add_argument("--prefixes", nargs="+", default=list(PREFIXES), help="image name prefixes, one video each")
+    parser.add_argument("--output-dir", default="./videos")
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--decode-workers", type=int, help="image decoding threads shared by all videos")
+    parser.add_argument("--prefetch", type=int, default=8, help="frames decoded ahead of each video writer")
+    args = parser.parse_args()
 
-    for image in images:
-        img_path = os.path.join(image_folder, image)
-        frame = cv2.imread(img_path)
-        video.write(frame)
+    start = time.perf_counter()
+    videos = create_videos(args.image_folder, args.prefixes, args.output_dir, args.fps,
+                           args.decode_workers, args.prefetch)
+    if not videos:
+        print(f"No images with prefixes {', '.join(args.prefixes)} in {args.image_folder}")
+        return 1
 
-    video.release()
+    for prefix, output_video in videos.items():
+        print(f"{prefix} video has been created successfully: {output_video}")
+    print(f"Created {len(videos)} videos in {time.perf_counter() - start:.1f}s")
+    return 0
 
 
-image_folder = 'images_20241104-230453'
-create_video(image_folder,"bed")
-print("Bed Video has been created successfully!")
-create_video(image_folder,"msk")
-print("Mask Video has been created successfully!")
-create_video(image_folder,"sim")
-print("Sim Video has been created successfully!")
\ No newline at end of file
+if __name__ == "__main__":
+    sys.exit(main())